@@ -3,6 +3,7 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from src.zypl_interview.auth.models import *
 from src.zypl_interview.database import Base
 from src.zypl_interview.music.models import *
 from src.zypl_interview.subscriptions.models import *
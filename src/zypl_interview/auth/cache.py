@@ -0,0 +1,7 @@
+"""This module contains the cache of verified tokens."""
+
+from src.zypl_interview.cache import LRUCache
+from src.zypl_interview.config import config
+
+token_cache = LRUCache(config.TOKEN_CACHE_SIZE, config.TOKEN_CACHE_TTL)
+"""`DecodedToken` by raw token."""
@@ -0,0 +1,71 @@
+"""This module contains the async password hasher.
+
+bcrypt is slow on purpose, so hashing and verification run in a thread
+pool instead of blocking the event loop. bcrypt releases the GIL, threads
+hash in parallel. Once too many calls are waiting for a thread, new ones
+are rejected with 429 instead of piling up.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.zypl_interview.auth.schemas import HasherMetrics
+from src.zypl_interview.auth.utils import hash_password, verify_password
+from src.zypl_interview.config import config
+from src.zypl_interview.exceptions import CustomBaseError
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords in a bounded thread pool."""
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="hasher")
+        self._pending = 0
+        self._metrics = HasherMetrics()
+        self._latency_total = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> HasherMetrics:
+        return self._metrics.model_copy(
+            update={
+                "in_flight": min(self._pending, self.workers),
+                "queued": max(self._pending - self.workers, 0),
+            }
+        )
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.workers + self.max_queue:
+            self._metrics.rejected += 1
+            raise CustomBaseError("Too many requests, try again later", 429)
+
+        self._pending += 1
+        started_at = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            latency = time.monotonic() - started_at
+            self._metrics.completed += 1
+            self._latency_total += latency
+            self._metrics.latency_avg = self._latency_total / self._metrics.completed
+            self._metrics.latency_max = max(self._metrics.latency_max, latency)
+
+
+password_hasher = PasswordHasher(
+    workers=config.PASSWORD_HASH_WORKERS,
+    max_queue=config.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,14 @@
+from src.zypl_interview.auth.jwt import JWTAuth
+from src.zypl_interview.auth.repository import AuthRepository
+from src.zypl_interview.auth.revocation import revocation_list
+from src.zypl_interview.auth.service import AuthService
+
+
+async def get_auth_service() -> AuthService:
+    """Get AuthService instance."""
+    auth_repository = AuthRepository()
+    return AuthService(
+        auth_repository=auth_repository,
+        revocation_list=revocation_list,
+        jwt_auth=JWTAuth(),
+    )
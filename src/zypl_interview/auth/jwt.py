@@ -1,4 +1,5 @@
 import logging
+import time
 import uuid
 from datetime import datetime
 from typing import Any
@@ -8,12 +9,13 @@ from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
+from src.zypl_interview.auth.cache import token_cache
+from src.zypl_interview.auth.revocation import revocation_list
 from src.zypl_interview.auth.schemas import DecodedToken
 from src.zypl_interview.config import config
-from src.zypl_interview.database import get_db_context_session
-from src.zypl_interview.users.repository import UserRepository
+from src.zypl_interview.database import current_user_id, get_db_context_session
+from src.zypl_interview.users.injectors import get_user_service
 from src.zypl_interview.users.schemas import UserOut
-from src.zypl_interview.users.service import UserService
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,7 @@ class JWTAuth:
         type: str,
         subject: str,
         payload: dict[str, Any],
+        ttl: int,
     ) -> str:
         current_timestamp = datetime.now().timestamp()
 
@@ -42,6 +45,7 @@ class JWTAuth:
             jti=str(uuid.uuid4()),
             iat=int(current_timestamp),
             nbf=int(current_timestamp),
+            exp=int(current_timestamp) + ttl,
         )
         payload.update(data)
 
@@ -54,15 +58,27 @@ class JWTAuth:
     def generate_access_token(self, user_in: UserOut) -> str:
         return self._generate_token(
             "access",
-            user_in.id,
+            str(user_in.id),
+            {"id": user_in.id, "username": user_in.username, "email": user_in.email},
+            config.ACCESS_TOKEN_TTL,
+        )
+
+    def generate_refresh_token(self, user_in: UserOut) -> str:
+        return self._generate_token(
+            "refresh",
+            str(user_in.id),
             {"id": user_in.id},
+            config.REFRESH_TOKEN_TTL,
         )
 
     @staticmethod
     def decode_jwt(token: str) -> DecodedToken | None:
         try:
             decoded_token = jwt.decode(
-                token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM]
+                token,
+                config.JWT_SECRET,
+                algorithms=[config.JWT_ALGORITHM],
+                options={"require": ["exp", "jti"]},
             )
             return DecodedToken(**decoded_token)
         except Exception as e:
@@ -82,24 +98,43 @@ class JWTBearer(HTTPBearer):
                     status_code=403, detail="Invalid authentication scheme."
                 )
             token = self.verify_jwt(credentials.credentials)
-            if not token:
+            if (
+                not token
+                or token.type != "access"
+                or revocation_list.is_revoked(token.jti)
+            ):
                 raise HTTPException(
                     status_code=403, detail="Invalid token or expired token."
                 )
-            async with get_db_context_session() as session:
-                user_service = UserService(
-                    UserRepository(),
-                )
-                logger.debug("Getting user by id")
-                user = await user_service.get_user_by_id(session, token.id)
+            if config.AUTH_STATELESS and token.username and token.email:
+                user = UserOut(id=token.id, username=token.username, email=token.email)
+            else:
+                user = await self._get_user(token)
+            current_user_id.set(user.id)
 
-                return Credentials(user=user, token=token)
+            return Credentials(user=user, token=token)
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
 
+    async def _get_user(self, token: DecodedToken) -> UserOut:
+        user_service = await get_user_service()
+        user = user_service.get_cached_user(token.id)
+        if user is None:
+            async with get_db_context_session() as session:
+                logger.debug("Getting user by id")
+                user = await user_service.get_user_by_id(session, token.id)
+        return user
+
     def verify_jwt(self, jwtoken: str) -> DecodedToken | None:
+        if (cached := token_cache.get(jwtoken)) is not None:
+            if cached.exp > time.time():
+                return cached
+            token_cache.delete(jwtoken)
+            return None
         try:
             payload = JWTAuth.decode_jwt(jwtoken)
-            return payload
         except Exception:
             return None
+        if payload is not None:
+            token_cache.set(jwtoken, payload)
+        return payload
@@ -0,0 +1,79 @@
+"""This module contains the sql logic for the auth module."""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.zypl_interview.auth.models import RevokedToken
+from src.zypl_interview.exceptions import CustomBaseError
+
+logger = logging.getLogger(__name__)
+
+
+class AuthRepository:
+    def __init__(self) -> None: ...
+
+    async def revoke_tokens(
+        self,
+        session: AsyncSession,
+        tokens: dict[str, datetime],
+    ) -> None:
+        """Insert revoked tokens, given as jti to expiry."""
+        stmt = pg_insert(RevokedToken).on_conflict_do_nothing()
+        try:
+            await session.execute(
+                stmt,
+                [
+                    {"jti": jti, "expires_at": expires_at}
+                    for jti, expires_at in tokens.items()
+                ],
+            )
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to revoke token", 500) from e
+
+    async def revoke_token_once(
+        self, session: AsyncSession, jti: str, expires_at: datetime
+    ) -> bool:
+        """Insert a revoked token, returns False if it was already revoked."""
+        stmt = (
+            pg_insert(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing()
+            .returning(RevokedToken.jti)
+        )
+        try:
+            result = await session.execute(stmt)
+            revoked = result.scalar() is not None
+            await session.commit()
+            return revoked
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to revoke token", 500) from e
+
+    async def get_revoked_jtis(self, session: AsyncSession) -> list[str]:
+        """Get jtis of revoked tokens that haven't expired yet."""
+        stmt = select(RevokedToken.jti).where(RevokedToken.expires_at > func.now())
+        try:
+            result = await session.execute(stmt)
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Failed to get revoked tokens", 500) from e
+
+    async def delete_expired(self, session: AsyncSession) -> None:
+        stmt = delete(RevokedToken).where(RevokedToken.expires_at <= func.now())
+        try:
+            await session.execute(stmt)
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to delete expired tokens", 500) from e
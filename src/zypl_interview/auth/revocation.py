@@ -0,0 +1,75 @@
+"""This module contains the in-memory denylist of revoked tokens.
+
+jtis of revoked tokens that haven't expired yet are reloaded from the
+database every `REVOCATION_SYNC_INTERVAL` seconds, so checking a token
+never waits for a query. A token revoked on another worker is accepted
+until the next sync.
+"""
+
+import asyncio
+import logging
+import time
+
+from src.zypl_interview.auth.repository import AuthRepository
+from src.zypl_interview.config import config
+from src.zypl_interview.database import get_db_context_session
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """Set of revoked jtis, periodically synced from the database."""
+
+    def __init__(self, auth_repository: AuthRepository, sync_interval: float) -> None:
+        self.auth_repository = auth_repository
+        self.sync_interval = sync_interval
+        self._jtis: frozenset[str] = frozenset()
+        self._local: dict[str, float] = {}
+        """Expiry timestamps of tokens revoked by this worker since the last sync."""
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._jtis or jti in self._local
+
+    def add(self, jti: str, exp: float) -> None:
+        """Deny a token on this worker right away, before the next sync."""
+        self._local[jti] = exp
+
+    async def sync(self) -> None:
+        """Reload revoked jtis and drop the expired ones from the table."""
+        async with get_db_context_session() as session:
+            await self.auth_repository.delete_expired(session)
+            jtis = await self.auth_repository.get_revoked_jtis(session)
+
+        self._jtis = frozenset(jtis)
+        # Keep tokens revoked while the query ran, until they expire.
+        now = time.time()
+        self._local = {
+            jti: exp
+            for jti, exp in self._local.items()
+            if jti not in self._jtis and exp > now
+        }
+        logger.debug(f"Synced {len(self._jtis)} revoked tokens")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Failed to sync revoked tokens")
+
+
+revocation_list = RevocationList(
+    AuthRepository(), sync_interval=config.REVOCATION_SYNC_INTERVAL
+)
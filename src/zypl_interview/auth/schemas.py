@@ -3,6 +3,16 @@ from pydantic import BaseModel
 
 class TokenOut(BaseModel):
     access_token: str
+    refresh_token: str
+
+
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
+
+class LogoutIn(BaseModel):
+    refresh_token: str | None = None
+    """Revoked along with the access token if given."""
 
 
 class DecodedToken(BaseModel):
@@ -13,3 +23,18 @@ class DecodedToken(BaseModel):
     jti: str
     iat: int
     nbf: int
+    exp: int
+    username: str | None = None
+    email: str | None = None
+    """Claims of access tokens, enough to authenticate without a db lookup."""
+
+
+class HasherMetrics(BaseModel):
+    in_flight: int = 0
+    queued: int = 0
+    completed: int = 0
+    rejected: int = 0
+    """Calls refused with 429 because the queue was full."""
+    latency_avg: float = 0
+    """Seconds from the call to the result, including time in the queue."""
+    latency_max: float = 0
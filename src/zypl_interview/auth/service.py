@@ -0,0 +1,77 @@
+"""This module contains the service layer for the auth module."""
+
+import logging
+from datetime import UTC, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.zypl_interview.auth.jwt import JWTAuth
+from src.zypl_interview.auth.repository import AuthRepository
+from src.zypl_interview.auth.revocation import RevocationList
+from src.zypl_interview.auth.schemas import DecodedToken, TokenOut
+from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.users.schemas import UserOut
+from src.zypl_interview.users.service import UserService
+
+logger = logging.getLogger(__name__)
+
+
+class AuthService:
+    def __init__(
+        self,
+        auth_repository: AuthRepository,
+        revocation_list: RevocationList,
+        jwt_auth: JWTAuth,
+    ) -> None:
+        self.auth_repository = auth_repository
+        self.revocation_list = revocation_list
+        self.jwt_auth = jwt_auth
+
+    def issue_tokens(self, user: UserOut) -> TokenOut:
+        """Issue a short-lived access token and a refresh token."""
+        return TokenOut(
+            access_token=self.jwt_auth.generate_access_token(user),
+            refresh_token=self.jwt_auth.generate_refresh_token(user),
+        )
+
+    async def refresh_tokens(
+        self,
+        session: AsyncSession,
+        refresh_token: str,
+        user_service: UserService,
+    ) -> TokenOut:
+        """Exchange a refresh token for new tokens, the old one is revoked.
+
+        Revoking is the check, of concurrent refreshes with the same token
+        only the one that inserts its jti gets new tokens.
+        """
+        token = self.decode_refresh_token(refresh_token)
+        user = await user_service.get_user_by_id(session, token.id)
+        if not await self.auth_repository.revoke_token_once(
+            session, token.jti, datetime.fromtimestamp(token.exp, UTC)
+        ):
+            raise CustomBaseError("Invalid refresh token", 401)
+        self.revocation_list.add(token.jti, token.exp)
+
+        logger.debug("Refreshing tokens")
+
+        return self.issue_tokens(user)
+
+    def decode_refresh_token(self, refresh_token: str) -> DecodedToken:
+        token = self.jwt_auth.decode_jwt(refresh_token)
+        if (
+            token is None
+            or token.type != "refresh"
+            or self.revocation_list.is_revoked(token.jti)
+        ):
+            raise CustomBaseError("Invalid refresh token", 401)
+        return token
+
+    async def revoke_tokens(self, session: AsyncSession, *tokens: DecodedToken) -> None:
+        """Deny tokens until they expire."""
+        await self.auth_repository.revoke_tokens(
+            session,
+            {token.jti: datetime.fromtimestamp(token.exp, UTC) for token in tokens},
+        )
+        for token in tokens:
+            self.revocation_list.add(token.jti, token.exp)
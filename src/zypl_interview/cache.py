@@ -0,0 +1,76 @@
+"""This module contains in-process caching primitives."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Protocol
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    """Counters of a cache backend."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+
+class CacheBackend(Protocol):
+    """Storage used by caches, so a shared store can replace the local one."""
+
+    def get(self, key: Hashable) -> Any | None: ...
+
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    def delete(self, key: Hashable) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> CacheStats: ...
+
+
+class LRUCache:
+    """Bounded in-memory cache with LRU eviction and per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._stats = CacheStats()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self._stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._stats.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self._stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        return self._stats.model_copy(update={"size": len(self._data)})
@@ -1,9 +1,17 @@
 import datetime
+import tempfile
 from datetime import tzinfo
+from enum import StrEnum
+from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class ReplicaStrategy(StrEnum):
+    round_robin = "round_robin"
+    least_connections = "least_connections"
+
+
 class Config(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -14,10 +22,121 @@ class Config(BaseSettings):
     DB_NAME: str
     DB_PASSWORD: str
     DB_ECHO: bool
+    DB_POOL_SIZE: int = 5
+    """Connections kept open per worker process."""
+    DB_MAX_OVERFLOW: int = 10
+    """Extra connections opened under load and closed when returned."""
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    """Seconds after which a connection is replaced, -1 keeps it forever."""
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARM: bool = True
+    """Open `DB_POOL_SIZE` connections on startup."""
+    DB_REPLICA_URLS: list[str] = []
+    """Urls of read replicas, as a json list."""
+    DB_REPLICA_STRATEGY: ReplicaStrategy = ReplicaStrategy.round_robin
+    DB_REPLICA_RETRY_AFTER: float = 30
+    """Seconds a replica that failed to connect gets no reads."""
+    DB_READ_YOUR_WRITES: float = 5
+    """Seconds a user reads from the primary after a write, 0 disables it.
+
+    Writes are tracked per worker process, a read served by another worker
+    can still hit a replica that hasn't caught up.
+    """
     JWT_SECRET: str
     JWT_ALGORITHM: str
+    ACCESS_TOKEN_TTL: int = 900
+    REFRESH_TOKEN_TTL: int = 30 * 24 * 3600
+    AUTH_STATELESS: bool = True
+    """Take the user from access token claims instead of the db.
+
+    A changed username shows up in access tokens issued after the change,
+    until then `/users/me/` returns the old one, for up to `ACCESS_TOKEN_TTL`.
+    """
+    REVOCATION_SYNC_INTERVAL: float = 10
+    """Seconds a token revoked on another worker can still be used."""
 
     TIME_ZONE: tzinfo = datetime.UTC
 
+    PASSWORD_HASH_WORKERS: int = 4
+    """Threads hashing and verifying passwords."""
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    """Max calls waiting for a hashing thread, more are rejected with 429."""
+
+    USER_CACHE_SIZE: int = 10000
+    """Max number of users cached for authentication, 0 disables the cache."""
+    USER_CACHE_TTL: float = 60
+    """Seconds a user change can stay unseen by other workers."""
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: float = 300
+
+    MUSIC_PAGE_SIZE: int = 10
+    MUSIC_MAX_PAGE_SIZE: int = 100
+    MUSIC_MAX_BATCH_SIZE: int = 50000
+    MUSIC_FAST_SERIALIZATION: bool = True
+    """Encode music listings from column tuples, skipping pydantic models."""
+    MUSIC_CACHE_SIZE: int = 1024
+    """Max number of cached music reads, 0 disables the cache."""
+    MUSIC_CACHE_TTL: float = 60
+    MUSIC_VERSIONS_SYNC_INTERVAL: float = 1
+    """Seconds a music write on another worker can stay unseen while NOTIFY is down."""
+
+    EXPORT_FETCH_SIZE: int = 2000
+    """Rows fetched per round trip from the server side cursor of an export."""
+
+    NOTIFY_WORKERS: int = 4
+    """Number of background tasks sending release notifications.
+
+    Also the number of digests the outbox dispatcher keeps in flight.
+    """
+    NOTIFY_QUEUE_SIZE: int = 10000
+    SUBSCRIBERS_CHUNK_SIZE: int = 5000
+    """Subscriber emails fetched per round trip when notifying a band."""
+    SUBSCRIPTIONS_PAGE_SIZE: int = 50
+    SUBSCRIPTIONS_MAX_PAGE_SIZE: int = 500
+    SUBSCRIPTIONS_MAX_BATCH_SIZE: int = 1000
+    SUBSCRIBER_INDEX_ENABLED: bool = False
+    """Keep all subscriptions in memory, loaded on startup."""
+    SUBSCRIBER_INDEX_RELOAD_INTERVAL: float = 60
+    """Seconds a subscription made on another worker can miss notifications."""
+    EVENTS_QUEUE_SIZE: int = 100
+    """Max undelivered real-time events per connection, newer ones are dropped."""
+    EVENTS_PING_INTERVAL: float = 15
+    EVENTS_RECONNECT_INTERVAL: float = 5
+    """Seconds to wait before listening again after losing the events connection."""
+    OUTBOX_BATCH_SIZE: int = 1000
+    """Outbox rows a dispatcher claims per round trip."""
+    OUTBOX_POLL_INTERVAL: float = 1
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    """Claims of a notification before it is moved to the dead status."""
+    OUTBOX_LEASE: float = 300
+    """Seconds a dispatcher has to send a claimed batch before it is retried."""
+    NOTIFY_DIGEST_WINDOW: float = 30
+    """Seconds a release waits in the outbox, so later ones share its digest."""
+
+    EMAIL_API_URL: str = "http://localhost:8025"
+    """Base url of the email provider, see `integration.stub_server`."""
+    EMAIL_API_KEY: str = ""
+    EMAIL_SENDER: str = "noreply@zypl.local"
+    EMAIL_BATCH_SIZE: int = 500
+    """Emails posted to the provider with a single request."""
+    EMAIL_MAX_CONNECTIONS: int = 20
+    EMAIL_TIMEOUT: float = 30
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_RETRY_BACKOFF: float = 0.5
+    """Upper bound of the first retry delay in seconds, doubled on each retry."""
+
+    CSV_CHUNK_SIZE: int = 5000
+    """Number of csv rows written to db with a single insert."""
+    CSV_MAX_REPORTED_ERRORS: int = 100
+    """Upper bound of rejected rows listed in the upload summary."""
+    ALBUM_ID_CACHE_SIZE: int = 100000
+    """Max number of album ids known to exist, used to validate csv rows."""
+    ALBUM_ID_CACHE_TTL: float = 60
+    """Seconds an album deleted on another worker can pass the csv row check."""
+    INGEST_SPOOL_DIR: Path = Path(tempfile.gettempdir()) / "zypl_ingest"
+    """Directory for uploaded files and state of background ingest jobs."""
+    INGEST_CONCURRENCY: int = 2
+
 
 config = Config()
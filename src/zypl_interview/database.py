@@ -1,14 +1,33 @@
 """This module contains the database configuration."""
 
 import asyncio
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+import functools
+import itertools
+import logging
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
 
-from sqlalchemy import URL
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from pydantic import BaseModel
+from sqlalchemy import URL, AsyncAdaptedQueuePool, Connection, Engine, event
+from sqlalchemy.engine import Dialect, ExceptionContext
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, ORMExecuteState, Session
+from sqlalchemy.pool import ConnectionPoolEntry
+
+from src.zypl_interview.config import ReplicaStrategy, config
 
-from src.zypl_interview.config import config
+logger = logging.getLogger(__name__)
 
 DB_URL = URL.create(
     drivername=config.DB_DRIVER,
@@ -19,56 +38,314 @@ DB_URL = URL.create(
     database=config.DB_NAME,
 )
 
-engine = create_async_engine(
-    DB_URL,
-    # echo=config.DB_ECHO,
-)
 
+class PoolStats(BaseModel):
+    """Counters of a connection pool."""
 
-async def get_db_session() -> AsyncSession:
-    """Get the database session."""
-    async_session = async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    """Connections open beyond `size`, negative while the pool isn't full yet."""
+    checkouts: int = 0
+    wait_avg: float = 0
+    """Seconds a checkout waits for a free or a new connection."""
+    wait_max: float = 0
+    timeouts: int = 0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that measures how long checkouts wait for a connection."""
 
-    async with async_session() as session:
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
         try:
-            yield session
-            await session.commit()
-            await asyncio.shield(session.close())
+            return super()._do_get()
+        except PoolTimeoutError:
+            self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started_at
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def stats(self) -> PoolStats:
+        return PoolStats(
+            size=self.size(),
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            overflow=self.overflow(),
+            checkouts=self._checkouts,
+            wait_avg=self._wait_total / self._checkouts if self._checkouts else 0,
+            wait_max=self._wait_max,
+            timeouts=self._timeouts,
+        )
+
+
+def _create_engine(url: URL | str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        # echo=config.DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+
+
+engine = _create_engine(DB_URL)
+
+replica_engines = [_create_engine(url) for url in config.DB_REPLICA_URLS]
+
+
+class ReplicaRouter:
+    """Picks the engine for read sessions.
 
+    Replicas that failed to connect are skipped for `retry_after` seconds.
+    Without a healthy replica reads go to the primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        strategy: ReplicaStrategy,
+        retry_after: float,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self._down_until: dict[AsyncEngine, float] = {}
+        self._next = itertools.count()
+        for replica in replicas:
+            event.listen(replica.sync_engine, "handle_error", self._handle_error)
+            event.listen(
+                replica.sync_engine,
+                "do_connect",
+                functools.partial(self._connect, replica),
+            )
+
+    def choose(self) -> AsyncEngine:
+        now = time.monotonic()
+        healthy = [
+            replica
+            for replica in self.replicas
+            if self._down_until.get(replica, 0) <= now
+        ]
+        if not healthy:
+            return self.primary
+        if self.strategy == ReplicaStrategy.least_connections:
+            return min(healthy, key=lambda replica: replica.pool.checkedout())
+        return healthy[next(self._next) % len(healthy)]
+
+    def is_down(self, engine: AsyncEngine) -> bool:
+        return self._down_until.get(engine, 0) > time.monotonic()
+
+    def mark_down(self, replica: AsyncEngine) -> None:
+        logger.warning(f"Replica {replica.url.host} is down, reading from primary")
+        self._down_until[replica] = time.monotonic() + self.retry_after
+
+    def _connect(
+        self,
+        replica: AsyncEngine,
+        dialect: Dialect,
+        connection_record: ConnectionPoolEntry,
+        cargs: tuple[Any, ...],
+        cparams: dict[str, Any],
+    ) -> DBAPIConnection:
+        """Open a connection to a replica, marking it down if that fails."""
+        try:
+            return dialect.connect(*cargs, **cparams)
         except Exception:
-            await session.rollback()
+            self.mark_down(replica)
             raise
-        finally:
-            await asyncio.shield(session.close())
+
+    def _handle_error(self, context: ExceptionContext) -> None:
+        if context.is_disconnect:
+            for replica in self.replicas:
+                if replica.sync_engine is context.engine:
+                    self.mark_down(replica)
+
+
+replica_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    strategy=config.DB_REPLICA_STRATEGY,
+    retry_after=config.DB_REPLICA_RETRY_AFTER,
+)
+
+current_user_id: ContextVar[int | None] = ContextVar("current_user_id", default=None)
+"""Id of the authenticated user of the request, set by `JWTBearer`."""
+
+_primary_pins: dict[int, float] = {}
+"""Users reading from the primary until the given time, after their writes.
+
+Kept per worker process, see `DB_READ_YOUR_WRITES`.
+"""
+
+
+def pin_to_primary(user_id: int) -> None:
+    if config.DB_READ_YOUR_WRITES <= 0 or not replica_engines:
+        return
+    now = time.monotonic()
+    if len(_primary_pins) > 10000:
+        for pinned_id, until in list(_primary_pins.items()):
+            if until <= now:
+                del _primary_pins[pinned_id]
+    _primary_pins[user_id] = now + config.DB_READ_YOUR_WRITES
+
+
+def _is_pinned(user_id: int | None) -> bool:
+    return user_id is not None and _primary_pins.get(user_id, 0) > time.monotonic()
+
+
+class RoutingSession(Session):
+    """Session binding read-only sessions to a replica.
+
+    The engine is picked on the first query, once the user of the request
+    is known, and kept for the rest of the session.
+    """
+
+    def get_bind(self, *args: Any, **kwargs: Any) -> Engine | Connection:
+        if not self.info.get("read_only"):
+            return super().get_bind(*args, **kwargs)
+
+        if "engine" not in self.info:
+            if _is_pinned(current_user_id.get()):
+                self.info["engine"] = replica_router.primary
+            else:
+                self.info["engine"] = replica_router.choose()
+        return self.info["engine"].sync_engine
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_writes(orm_execute_state: ORMExecuteState) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_writer(session: Session) -> None:
+    # Pinned on commit, before the response that reports the write is sent.
+    if session.info.pop("wrote", False) and (user_id := current_user_id.get()):
+        pin_to_primary(user_id)
+
+
+class ReadSession(AsyncSession):
+    """Read-only session retrying a query once on the primary.
+
+    A query fails over when its replica fails to connect or drops the
+    connection. Rows already taken from a stream aren't read again, so a
+    stream that breaks halfway still fails.
+    """
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_primary(super().execute, *args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_primary(super().scalar, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_primary(super().get, *args, **kwargs)
+
+    async def stream(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_primary(super().stream, *args, **kwargs)
+
+    async def _retry_on_primary(
+        self, query: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        try:
+            return await query(*args, **kwargs)
+        except (DBAPIError, OSError):
+            replica = self.sync_session.info.get("engine")
+            # Marked down by the hooks of the router, other errors are raised.
+            if replica is None or not replica_router.is_down(replica):
+                raise
+        logger.warning(f"Retrying read of replica {replica.url.host} on primary")
+        await self.rollback()
+        self.sync_session.info["engine"] = replica_router.primary
+        return await query(*args, **kwargs)
+
+
+session_factory = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+)
+
+
+read_session_factory = async_sessionmaker(
+    engine,
+    class_=ReadSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    info={"read_only": True},
+)
+
+
+async def get_db_session() -> AsyncSession:
+    """Get the database session."""
+    async with get_db_context_session() as session:
+        yield session
+
+
+async def get_db_read_session() -> AsyncSession:
+    """Get a read-only database session, served by a replica if there is one.
+
+    Users read from the primary for `DB_READ_YOUR_WRITES` seconds after
+    their own writes.
+    """
+    async with get_db_read_context_session() as session:
+        yield session
 
 
 @asynccontextmanager
 async def get_db_context_session() -> AsyncGenerator[AsyncSession, None]:
     """Get the database session."""
-    async_session = async_sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    session = session_factory()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await asyncio.shield(session.close())
 
-    async with async_session() as session:
-        try:
-            yield session
-            await session.commit()
-            await asyncio.shield(session.close())
 
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await asyncio.shield(session.close())
+@asynccontextmanager
+async def get_db_read_context_session() -> AsyncGenerator[AsyncSession, None]:
+    """Get a read-only database session."""
+    session = read_session_factory()
+    try:
+        yield session
+    finally:
+        await asyncio.shield(session.close())
+
+
+async def warm_pool(connections: int) -> None:
+    """Open connections up front, so first requests don't pay for them."""
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            connection = await stack.enter_async_context(engine.connect())
+            await connection.exec_driver_sql("SELECT 1")
 
 
 class Base(DeclarativeBase):
     """Base class for the database models."""
-
-    pass  # noqa: PIE790
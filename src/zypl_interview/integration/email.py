@@ -1,10 +1,157 @@
 """This class is responsible for sending emails to users."""
 
+import asyncio
+import itertools
+import logging
+import random
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from src.zypl_interview.config import config
+from src.zypl_interview.exceptions import CustomBaseError
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(slots=True)
+class EmailMessage:
+    to: str
+    subject: str
+    body: str
+
+
+@dataclass(slots=True)
+class SendResult:
+    sent: int = 0
+    failed: list[EmailMessage] = field(default_factory=list)
+    """Emails of batches the provider didn't accept, even after retries."""
+
 
 class EmailIntegration:
-    """This class is responsible for sending emails to users."""
+    """This class is responsible for sending emails to users.
+
+    Emails are posted to the batch endpoint of the provider over a shared
+    keep-alive session. Failed batches are retried with jittered backoff.
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        sender: str,
+        batch_size: int,
+        max_connections: int,
+        timeout: float,
+        max_retries: int,
+        retry_backoff: float,
+    ) -> None:
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.sender = sender
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._session: aiohttp.ClientSession | None = None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def send_email(self, email: str, subject: str, body: str) -> None:
         """Send email to user."""
-        # Don't really have the time to implement this. :(
-        print(f"Sending email to {email} with subject: {subject} and body: {body}")
+        result = await self.send_emails([EmailMessage(email, subject, body)])
+        if result.failed:
+            raise CustomBaseError("Failed to send email", 502)
+
+    async def send_emails(self, messages: Iterable[EmailMessage]) -> SendResult:
+        """Send emails in batches.
+
+        Batches are sent concurrently, bounded by the connection limit. A
+        failed batch doesn't stop the others, its emails are returned so
+        only they can be retried.
+        """
+        batches = list(_chunked(messages, self.batch_size))
+        results = await asyncio.gather(
+            *(self._send_batch(batch) for batch in batches), return_exceptions=True
+        )
+
+        result = SendResult()
+        for batch, error in zip(batches, results, strict=True):
+            if error is None:
+                result.sent += len(batch)
+            elif isinstance(error, Exception):
+                logger.error(getattr(error, "message", error))
+                result.failed.extend(batch)
+            else:
+                raise error
+        return result
+
+    async def _send_batch(self, batch: tuple[EmailMessage, ...]) -> None:
+        payload = {
+            "messages": [
+                {
+                    "from": self.sender,
+                    "to": message.to,
+                    "subject": message.subject,
+                    "text": message.body,
+                }
+                for message in batch
+            ]
+        }
+        session = self._get_session()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with session.post(
+                    f"{self.api_url}/v1/send/batch", json=payload
+                ) as response:
+                    if response.status < 400:
+                        return
+                    if response.status not in RETRY_STATUSES:
+                        raise CustomBaseError(
+                            f"Email provider rejected batch: {response.status}", 502
+                        )
+                    error = f"status {response.status}"
+            except (aiohttp.ClientError, TimeoutError) as e:
+                error = repr(e)
+
+            if attempt == self.max_retries:
+                break
+            delay = random.uniform(0, self.retry_backoff * 2**attempt)
+            logger.warning(f"Email batch failed with {error}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        raise CustomBaseError(f"Failed to send email batch: {error}", 502)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+        return self._session
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterable[tuple]:
+    iterator = iter(iterable)
+    while batch := tuple(itertools.islice(iterator, size)):
+        yield batch
+
+
+email_integration = EmailIntegration(
+    api_url=config.EMAIL_API_URL,
+    api_key=config.EMAIL_API_KEY,
+    sender=config.EMAIL_SENDER,
+    batch_size=config.EMAIL_BATCH_SIZE,
+    max_connections=config.EMAIL_MAX_CONNECTIONS,
+    timeout=config.EMAIL_TIMEOUT,
+    max_retries=config.EMAIL_MAX_RETRIES,
+    retry_backoff=config.EMAIL_RETRY_BACKOFF,
+)
@@ -0,0 +1,92 @@
+"""Local stand-in for the email provider, used in tests and benchmarks.
+
+Accepts the batch-send requests of `EmailIntegration` and only counts them.
+A share of requests can be failed to exercise the retries of the client,
+and batches with given recipients can be rejected for good.
+
+Run with `python -m src.zypl_interview.integration.stub_server --port 8025`.
+"""
+
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+
+class StubEmailProvider:
+    """Counts emails posted to the batch endpoint."""
+
+    def __init__(
+        self,
+        failure_rate: float = 0.0,
+        latency: float = 0.0,
+        fail_first: int = 0,
+        rejected_recipients: frozenset[str] = frozenset(),
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.fail_first = fail_first
+        """Number of first requests failed regardless of `failure_rate`."""
+        self.rejected_recipients = rejected_recipients
+        """Batches sent to any of them are rejected without a retry."""
+        self.requests = 0
+        self.failed_requests = 0
+        self.emails = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/send/batch", self.send_batch)
+        app.router.add_get("/v1/stats", self.stats)
+        return app
+
+    async def send_batch(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        number = self.requests
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if number <= self.fail_first or random.random() < self.failure_rate:
+                self.failed_requests += 1
+                return web.json_response({"error": "unavailable"}, status=503)
+
+            payload = await request.json()
+            recipients = {message["to"] for message in payload["messages"]}
+            if recipients & self.rejected_recipients:
+                self.failed_requests += 1
+                return web.json_response({"error": "rejected"}, status=422)
+
+            self.emails += len(payload["messages"])
+            return web.json_response({"accepted": len(payload["messages"])})
+        finally:
+            self.in_flight -= 1
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "failed_requests": self.failed_requests,
+                "emails": self.emails,
+                "max_in_flight": self.max_in_flight,
+            }
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    provider = StubEmailProvider(args.failure_rate, args.latency)
+    web.run_app(provider.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,19 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.openapi.models import Response
 from fastapi.responses import JSONResponse
 
+from src.zypl_interview.auth.hashing import password_hasher
+from src.zypl_interview.auth.revocation import revocation_list
 from src.zypl_interview.config import config
+from src.zypl_interview.database import engine, warm_pool
 from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.integration.email import email_integration
+from src.zypl_interview.music.jobs import ingest_jobs
+from src.zypl_interview.music.versions import music_versions
 from src.zypl_interview.routes import router_factory
+from src.zypl_interview.subscriptions.events import event_hub
+from src.zypl_interview.subscriptions.index import subscriber_index
+from src.zypl_interview.subscriptions.notifier import notifier
+from src.zypl_interview.subscriptions.outbox import outbox_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +30,29 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI) -> AsyncGenerator:
     """Lifspan event handler."""
     logger.debug("Preparing the app.")
+    if config.DB_POOL_WARM:
+        await warm_pool(config.DB_POOL_SIZE)
+    await revocation_list.start()
+    await music_versions.start()
+    await subscriber_index.start()
+    await event_hub.start()
+    await notifier.start()
+    await outbox_dispatcher.start()
+    await ingest_jobs.start()
 
     yield
 
+    await ingest_jobs.stop()
+    await outbox_dispatcher.stop()
+    await notifier.stop()
+    await event_hub.stop()
+    await subscriber_index.stop()
+    await email_integration.close()
+    password_hasher.close()
+    await music_versions.stop()
+    await revocation_list.stop()
+    await engine.dispose()
+
 
 def app_factory() -> FastAPI:
     """Builds the FastAPI app with the necessary middleware and routes."""
@@ -0,0 +1,46 @@
+"""This module contains the read-through cache of music listings."""
+
+from collections.abc import Hashable
+from typing import Any
+
+from src.zypl_interview.cache import CacheBackend, CacheStats, LRUCache
+from src.zypl_interview.config import config
+from src.zypl_interview.music.schemas import MusicType
+from src.zypl_interview.music.versions import MusicVersions, music_versions
+
+
+class MusicCache:
+    """Cache of music read results, invalidated per music type.
+
+    Keys carry the version of their music type. Every write bumps the
+    version, so stale entries become unreachable and age out of the
+    backend without scanning it.
+    """
+
+    def __init__(self, backend: CacheBackend, versions: MusicVersions) -> None:
+        self.backend = backend
+        self.versions = versions
+
+    def key(self, music_type: MusicType, *params: Hashable) -> tuple[Hashable, ...]:
+        """Build a cache key for a read of the given music type."""
+        return music_type, self.versions.get(music_type), *params
+
+    def get(self, key: tuple[Hashable, ...]) -> Any | None:
+        return self.backend.get(key)
+
+    def set(self, key: tuple[Hashable, ...], value: Any) -> None:
+        self.backend.set(key, value)
+
+    def stats(self) -> CacheStats:
+        return self.backend.stats()
+
+
+music_cache = MusicCache(
+    LRUCache(maxsize=config.MUSIC_CACHE_SIZE, ttl=config.MUSIC_CACHE_TTL),
+    music_versions,
+)
+
+album_ids_cache = LRUCache(
+    maxsize=config.ALBUM_ID_CACHE_SIZE, ttl=config.ALBUM_ID_CACHE_TTL
+)
+"""Ids of albums known to exist."""
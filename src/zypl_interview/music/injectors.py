@@ -1,15 +1,18 @@
 """This module contains injector of music service."""
 
+from src.zypl_interview.music.cache import album_ids_cache, music_cache
 from src.zypl_interview.music.repository import MusicRepository
 from src.zypl_interview.music.service import MusicService
-from src.zypl_interview.subscriptions.injectors import get_subs_service
+from src.zypl_interview.music.versions import music_versions
+from src.zypl_interview.subscriptions.outbox import outbox_dispatcher
 
 
 async def get_music_service() -> MusicService:
     """Get MusicService instance."""
-    music_repository = MusicRepository()
-    subscription_service = await get_subs_service()
+    music_repository = MusicRepository(versions=music_versions)
     return MusicService(
-        subscription_service=subscription_service,
+        outbox_dispatcher=outbox_dispatcher,
         music_repository=music_repository,
+        music_cache=music_cache,
+        album_ids_cache=album_ids_cache,
     )
@@ -0,0 +1,182 @@
+"""This module contains background ingest jobs for large csv files.
+
+Every job keeps its upload and a json state file in the spool directory.
+The state is rewritten after each committed chunk, so a job interrupted by
+a crash or a restart resumes from its last committed chunk.
+"""
+
+import asyncio
+import fcntl
+import logging
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import get_db_context_session
+from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.music.injectors import get_music_service
+from src.zypl_interview.music.schemas import (
+    CsvUploadOut,
+    IngestJobOut,
+    IngestJobStatus,
+    IngestMode,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IngestJobManager:
+    """Runs csv ingest jobs in the background with bounded concurrency."""
+
+    def __init__(self, spool_dir: Path, concurrency: int) -> None:
+        self.spool_dir = spool_dir
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def start(self) -> None:
+        """Resume jobs left unfinished by a previous run."""
+        await run_in_threadpool(self.spool_dir.mkdir, parents=True, exist_ok=True)
+        for state_path in self.spool_dir.glob("*.json"):
+            job = await self._load(state_path.stem)
+            if job.status in (IngestJobStatus.queued, IngestJobStatus.running):
+                logger.debug("Resuming ingest job %s", job.id)
+                self._schedule(job)
+
+    async def stop(self) -> None:
+        """Cancel running jobs, they are resumed on the next start."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def submit(self, file: BinaryIO, mode: IngestMode) -> IngestJobOut:
+        """Spool a csv file to disk and queue it for ingest."""
+        now = datetime.now(config.TIME_ZONE)
+        job = IngestJobOut(
+            id=uuid.uuid4().hex,
+            status=IngestJobStatus.queued,
+            mode=mode,
+            created_at=now,
+            updated_at=now,
+        )
+        await run_in_threadpool(self._spool, file, self._csv_path(job.id))
+        await self._save(job)
+        self._schedule(job)
+        return job
+
+    async def get(self, job_id: str) -> IngestJobOut:
+        """Get job state, including jobs run by other workers."""
+        try:
+            uuid.UUID(hex=job_id)
+            return await self._load(job_id)
+        except (ValueError, FileNotFoundError) as e:
+            raise CustomBaseError("Ingest job not found", status_code=404) from e
+
+    def _schedule(self, job: IngestJobOut) -> None:
+        task = asyncio.create_task(self._run(job.id))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+
+    async def _run(self, job_id: str) -> None:
+        async with self._semaphore:
+            csv_path = self._csv_path(job_id)
+            try:
+                stream = await run_in_threadpool(open, csv_path, "rb")
+            except FileNotFoundError:
+                # Another worker has finished the job and removed the file.
+                logger.debug("Ingest job %s has no file left", job_id)
+                return
+
+            job = None
+            try:
+                try:
+                    # Another worker may be resuming the same job.
+                    fcntl.flock(stream, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return
+
+                # Loaded under the lock, a worker that held it before may
+                # have moved the job on since it was scheduled here.
+                job = await self._load(job_id)
+                if job.status in (IngestJobStatus.queued, IngestJobStatus.running):
+                    await self._ingest(job, stream)
+            finally:
+                # Removed while still locked, so no other worker picks it up.
+                if job is not None and job.status in (
+                    IngestJobStatus.finished,
+                    IngestJobStatus.failed,
+                ):
+                    await run_in_threadpool(csv_path.unlink, missing_ok=True)
+                await run_in_threadpool(stream.close)
+
+    async def _ingest(self, job: IngestJobOut, stream: BinaryIO) -> None:
+        started_at = time.monotonic()
+        resumed_from = job.summary.rows
+
+        async def on_chunk(summary: CsvUploadOut) -> None:
+            job.summary = summary
+            job.rows_processed = summary.rows - summary.rejected
+            job.rows_failed = summary.rejected
+            rows = summary.rows - resumed_from
+            job.rows_per_second = rows / max(time.monotonic() - started_at, 1e-6)
+            await self._save(job)
+
+        job.status = IngestJobStatus.running
+        await self._save(job)
+
+        music_service = await get_music_service()
+        try:
+            async with get_db_context_session() as session:
+                await music_service.ingest_songs_csv(
+                    session,
+                    stream,
+                    mode=job.mode,
+                    summary=job.summary.model_copy(deep=True),
+                    on_chunk=on_chunk,
+                )
+            job.status = IngestJobStatus.finished
+        except CustomBaseError as e:
+            job.status = IngestJobStatus.failed
+            job.error = e.message
+        except Exception:
+            logger.exception("Ingest job %s failed", job.id)
+            job.status = IngestJobStatus.failed
+            job.error = "Ingest failed"
+
+        logger.debug("Ingest job %s is %s", job.id, job.status)
+        await self._save(job)
+
+    async def _save(self, job: IngestJobOut) -> None:
+        job.updated_at = datetime.now(config.TIME_ZONE)
+        await run_in_threadpool(self._write_state, job, self._state_path(job.id))
+
+    async def _load(self, job_id: str) -> IngestJobOut:
+        content = await run_in_threadpool(self._state_path(job_id).read_bytes)
+        return IngestJobOut.model_validate_json(content)
+
+    def _csv_path(self, job_id: str) -> Path:
+        return self.spool_dir / f"{job_id}.csv"
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.spool_dir / f"{job_id}.json"
+
+    @classmethod
+    def _spool(cls, file: BinaryIO, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as spool:
+            shutil.copyfileobj(file, spool)
+
+    @classmethod
+    def _write_state(cls, job: IngestJobOut, path: Path) -> None:
+        # Written aside and renamed, so readers never see a partial state.
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(job.model_dump_json())
+        tmp_path.replace(path)
+
+
+ingest_jobs = IngestJobManager(config.INGEST_SPOOL_DIR, config.INGEST_CONCURRENCY)
@@ -1,5 +1,5 @@
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.zypl_interview.database import Base
 
@@ -10,6 +10,11 @@ class Band(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(nullable=False)
 
+    albums: Mapped[list["Album"]] = relationship(
+        back_populates="band", lazy="raise", order_by="Album.id"
+    )
+    """Has to be loaded eagerly, lazy loading doesn't work with async session."""
+
 
 class Album(Base):
     __tablename__ = "albums"
@@ -18,6 +23,16 @@ class Album(Base):
     name: Mapped[str] = mapped_column(nullable=False)
     band_id: Mapped[int] = mapped_column(ForeignKey(Band.id), nullable=False)
 
+    band: Mapped[Band] = relationship(back_populates="albums", lazy="raise")
+    songs: Mapped[list["Song"]] = relationship(
+        back_populates="album", lazy="raise", order_by="Song.id"
+    )
+
+    __table_args__ = (
+        Index("ix_albums_band_id_id", band_id, id),
+        UniqueConstraint(band_id, name, name="uq_albums_band_id_name"),
+    )
+
 
 class Song(Base):
     __tablename__ = "songs"
@@ -25,3 +40,18 @@ class Song(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(nullable=False)
     album_id: Mapped[int] = mapped_column(ForeignKey(Album.id), nullable=False)
+
+    album: Mapped[Album] = relationship(back_populates="songs", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_songs_album_id_id", album_id, id),
+        UniqueConstraint(album_id, name, name="uq_songs_album_id_name"),
+    )
+
+
+class MusicVersion(Base):
+    __tablename__ = "music_versions"
+
+    type: Mapped[str] = mapped_column(primary_key=True)
+    """Value of `MusicType`."""
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -1,18 +1,48 @@
 import logging
-from typing import Type
+from collections.abc import AsyncIterator
+from typing import ClassVar
 
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    String,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
 from src.zypl_interview.exceptions import CustomBaseError
 from src.zypl_interview.music.models import Album, Band, Song
+from src.zypl_interview.music.schemas import IngestMode, MusicType
+from src.zypl_interview.music.versions import MusicVersions
+from src.zypl_interview.subscriptions.events import (
+    RELEASES_CHANNEL,
+    encode_release_event,
+)
+from src.zypl_interview.subscriptions.models import NotificationOutbox
 
 logger = logging.getLogger(__name__)
 
 
 class MusicRepository:
-    def __init__(self): ...
+    _music_types: ClassVar[dict[type[Band] | type[Album] | type[Song], MusicType]] = {
+        Band: MusicType.band,
+        Album: MusicType.album,
+        Song: MusicType.song,
+    }
+
+    def __init__(self, versions: MusicVersions):
+        self.versions = versions
 
     async def add_song(self, session: AsyncSession, name: str, album_id: str) -> Song:
         stmt = (
@@ -27,19 +57,54 @@ class MusicRepository:
         )
         try:
             result = await session.execute(stmt)
-            await session.commit()
+            await self._commit(session, MusicType.song)
             return result.scalar()
         except SQLAlchemyError as e:
             logger.error(e)
             await session.rollback()
             raise CustomBaseError("Failed to insert song", 409) from e
 
+    async def add_songs(
+        self,
+        session: AsyncSession,
+        songs: list[dict[str, int | str]],
+        mode: IngestMode = IngestMode.insert,
+    ) -> int:
+        """Insert a chunk of songs in one statement and one transaction.
+
+        Conflicts on (album_id, name) are skipped or rejected depending on
+        `mode`. Returns the number of inserted songs.
+        """
+        stmt = pg_insert(Song)
+        if mode == IngestMode.skip:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=[Song.album_id, Song.name]
+            )
+        # Skipped rows aren't returned.
+        stmt = stmt.returning(Song.id)
+
+        try:
+            result = await session.execute(stmt, songs)
+            await self._commit(session, MusicType.song)
+            return len(result.all())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to insert songs", 409) from e
+
     async def add_album(self, session: AsyncSession, name: str, band_id: str) -> Album:
         stmt = insert(Album).values(name=name, band_id=band_id).returning(Album)
         try:
             result = await session.execute(stmt)
-            await session.commit()
-            return result.scalar()
+            album = result.scalar()
+            await session.execute(
+                insert(NotificationOutbox).values(band_id=band_id, album_id=album.id)
+            )
+            await self._notify_releases(
+                session, [(album.band_id, album.id, album.name)]
+            )
+            await self._commit(session, MusicType.album)
+            return album
 
         except SQLAlchemyError as e:
             logger.error(e)
@@ -50,19 +115,69 @@ class MusicRepository:
         stmt = insert(Band).values(name=name).returning(Band)
         try:
             result = await session.execute(stmt)
-            await session.commit()
+            await self._commit(session, MusicType.band)
             return result.scalar()
         except SQLAlchemyError as e:
             logger.error(e)
             await session.rollback()
             raise CustomBaseError("Insertion failed", 409) from e
 
+    async def add_music_batch(
+        self,
+        session: AsyncSession,
+        bands: list[dict[str, int | str]],
+        albums: list[dict[str, int | str]],
+        songs: list[dict[str, int | str]],
+    ) -> tuple[list[int], list[int], list[int]]:
+        """Insert bands, albums and songs in one transaction.
+
+        Every type is written with a single multi-row insert. Ids come back
+        in the order of the given rows. Release notifications and events of
+        the albums are written in the same transaction.
+        """
+        try:
+            band_ids = await self._insert_returning_ids(session, Band, bands)
+            album_ids = await self._insert_returning_ids(session, Album, albums)
+            song_ids = await self._insert_returning_ids(session, Song, songs)
+            if albums:
+                await session.execute(
+                    insert(NotificationOutbox),
+                    [
+                        {"band_id": album["band_id"], "album_id": album_id}
+                        for album, album_id in zip(albums, album_ids, strict=True)
+                    ],
+                )
+                await self._notify_releases(
+                    session,
+                    [
+                        (album["band_id"], album_id, album["name"])
+                        for album, album_id in zip(albums, album_ids, strict=True)
+                    ],
+                )
+            await self._commit(
+                session,
+                *(
+                    self._music_types[music]
+                    for music, rows in ((Band, bands), (Album, albums), (Song, songs))
+                    if rows
+                ),
+            )
+            return band_ids, album_ids, song_ids
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Insertion failed", 409) from e
+
     async def get_music(
         self,
         session: AsyncSession,
-        music: Type[Song] | Type[Album] | Type[Band],
+        music: type[Song] | type[Album] | type[Band],
+        limit: int,
+        after_id: int | None = None,
+        parent_id: int | None = None,
     ) -> list[Song | Album | Band]:
-        stmt = select(music).limit(10)
+        """Get a page of music ordered by id, starting after `after_id`."""
+        stmt = self._page_stmt(select(music), music, limit, after_id, parent_id)
         try:
             result = await session.execute(stmt)
             return result.scalars().all()
@@ -73,10 +188,96 @@ class MusicRepository:
             logger.error(e)
             raise CustomBaseError("Music not found!", status_code=400) from e
 
+    async def get_music_rows(
+        self,
+        session: AsyncSession,
+        music: type[Song] | type[Album] | type[Band],
+        limit: int,
+        after_id: int | None = None,
+        parent_id: int | None = None,
+    ) -> list[Row]:
+        """Same as `get_music`, but selects plain column tuples."""
+        columns = select(*music.__table__.columns)
+        stmt = self._page_stmt(columns, music, limit, after_id, parent_id)
+        try:
+            result = await session.execute(stmt)
+            return result.all()
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Music not found!", status_code=400) from e
+
+    async def stream_music_rows(
+        self,
+        session: AsyncSession,
+        music: type[Song] | type[Album] | type[Band],
+        fetch_size: int,
+    ) -> AsyncIterator[list[Row]]:
+        """Stream all rows of a music table through a server side cursor."""
+        stmt = (
+            select(*music.__table__.columns)
+            .order_by(music.id)
+            .execution_options(yield_per=fetch_size)
+        )
+        try:
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Export failed", status_code=500) from e
+
+    async def get_existing_album_ids(
+        self, session: AsyncSession, album_ids: list[int]
+    ) -> set[int]:
+        """Get which of the given album ids exist, with a single query."""
+        stmt = select(Album.id).where(
+            Album.id == any_(bindparam("ids", album_ids, type_=ARRAY(Integer)))
+        )
+        try:
+            result = await session.execute(stmt)
+            return set(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Music not found!", status_code=400) from e
+
+    async def get_band(self, session: AsyncSession, band_id: int) -> Band | None:
+        try:
+            return await session.get(Band, band_id)
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Music not found!", status_code=400) from e
+
+    async def stream_discography_rows(
+        self, session: AsyncSession, band_id: int, fetch_size: int
+    ) -> AsyncIterator[list[Row]]:
+        """Stream albums of a band joined with their songs, ordered by album.
+
+        Albums without songs come as a single row with null song columns.
+        """
+        stmt = (
+            select(
+                Album.id,
+                Album.name,
+                Song.id.label("song_id"),
+                Song.name.label("song_name"),
+            )
+            .outerjoin(Song, Song.album_id == Album.id)
+            .where(Album.band_id == band_id)
+            .order_by(Album.id, Song.id)
+            .execution_options(yield_per=fetch_size)
+        )
+        try:
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Music not found!", status_code=400) from e
+
     async def update_music(
         self,
         session: AsyncSession,
-        music: Type[Song] | Type[Album] | Type[Band],
+        music: type[Song] | type[Album] | type[Band],
         music_id: int,
         new_name: str,
     ) -> list[Song | Album | Band]:
@@ -88,24 +289,153 @@ class MusicRepository:
         )
         try:
             result = await session.execute(stmt)
-            await session.commit()
+            await self._commit(session, self._music_types[music])
             return result.scalars().all()
         except SQLAlchemyError as e:
             logger.error(e)
             await session.rollback()
             raise CustomBaseError("Update failed", status_code=400) from e
 
+    async def update_music_batch(
+        self,
+        session: AsyncSession,
+        music: type[Song] | type[Album] | type[Band],
+        new_names: dict[int, str],
+    ) -> list[int]:
+        """Rename music objects with a single `UPDATE ... FROM unnest(...)`.
+
+        Returns ids of the updated rows.
+        """
+        names = (
+            func.unnest(
+                bindparam("ids", list(new_names), type_=ARRAY(Integer)),
+                bindparam("names", list(new_names.values()), type_=ARRAY(String)),
+            )
+            .table_valued("id", "name")
+            .render_derived(name="new_names")
+        )
+        stmt = (
+            update(music)
+            .where(music.id == names.c.id)
+            .values(name=names.c.name)
+            .returning(music.id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.execute(stmt)
+            await self._commit(session, self._music_types[music])
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Update failed", status_code=400) from e
+
+    async def delete_music_batch(
+        self,
+        session: AsyncSession,
+        music: type[Song] | type[Album] | type[Band],
+        music_ids: list[int],
+    ) -> list[int]:
+        """Delete music objects with a single `DELETE ... WHERE id = ANY(...)`.
+
+        Returns ids of the deleted rows.
+        """
+        stmt = (
+            delete(music)
+            .where(music.id == any_(bindparam("ids", music_ids, type_=ARRAY(Integer))))
+            .returning(music.id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.execute(stmt)
+            await self._commit(session, self._music_types[music])
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Deletion failed", status_code=400) from e
+
     async def delete_music(
         self,
         session: AsyncSession,
-        music: Type[Song] | Type[Album] | Type[Band],
+        music: type[Song] | type[Album] | type[Band],
         music_id: int,
     ) -> None:
         stmt = delete(music).where(music.id == music_id)
         try:
             await session.execute(stmt)
-            await session.commit()
+            await self._commit(session, self._music_types[music])
         except SQLAlchemyError as e:
             logger.error(e)
             await session.rollback()
             raise CustomBaseError("Deletion failed", status_code=400) from e
+
+    async def _commit(self, session: AsyncSession, *music_types: MusicType) -> None:
+        """Commit a write together with the versions of its music types."""
+        versions = await self.versions.bump(session, *music_types)
+        await session.commit()
+        self.versions.update(versions)
+
+    @classmethod
+    async def _notify_releases(
+        cls, session: AsyncSession, albums: list[tuple[int, int, str]]
+    ) -> None:
+        """Send release events of (band_id, album_id, name) albums with NOTIFY.
+
+        Postgres delivers them to every listening worker on commit.
+        """
+        payloads = [
+            payload
+            for album in albums
+            if (payload := encode_release_event(*album)) is not None
+        ]
+        if not payloads:
+            return
+        events = func.unnest(
+            bindparam("payloads", payloads, type_=ARRAY(String))
+        ).table_valued("payload")
+        await session.execute(
+            select(func.pg_notify(RELEASES_CHANNEL, events.c.payload)).select_from(
+                events
+            )
+        )
+
+    @classmethod
+    async def _insert_returning_ids(
+        cls,
+        session: AsyncSession,
+        music: type[Song] | type[Album] | type[Band],
+        rows: list[dict[str, int | str]],
+    ) -> list[int]:
+        if not rows:
+            return []
+        stmt = insert(music).returning(music.id, sort_by_parameter_order=True)
+        result = await session.execute(stmt, rows)
+        return list(result.scalars())
+
+    @classmethod
+    def _page_stmt(
+        cls,
+        stmt: Select,
+        music: type[Song] | type[Album] | type[Band],
+        limit: int,
+        after_id: int | None,
+        parent_id: int | None,
+    ) -> Select:
+        stmt = stmt.order_by(music.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(music.id > after_id)
+        if parent_id is not None:
+            stmt = stmt.where(cls._parent_column(music) == parent_id)
+        return stmt
+
+    @classmethod
+    def _parent_column(
+        cls,
+        music: type[Song] | type[Album] | type[Band],
+    ) -> InstrumentedAttribute[int]:
+        if music is Album:
+            return Album.band_id
+        if music is Song:
+            return Song.album_id
+        raise CustomBaseError("Bands can't be filtered by parent", status_code=422)
@@ -1,13 +1,46 @@
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.zypl_interview.auth.jwt import Credentials, JWTBearer
-from src.zypl_interview.database import get_db_session
+from src.zypl_interview.cache import CacheStats
+from src.zypl_interview.config import config
+from src.zypl_interview.database import (
+    get_db_read_context_session,
+    get_db_read_session,
+    get_db_session,
+)
 from src.zypl_interview.music.injectors import get_music_service
-from src.zypl_interview.music.schemas import MusicIn, MusicOut, MusicType, MusicUpdateIn
+from src.zypl_interview.music.jobs import ingest_jobs
+from src.zypl_interview.music.schemas import (
+    CsvUploadOut,
+    DiscographyOut,
+    ExportFormat,
+    IngestJobOut,
+    IngestMode,
+    MusicBatchDeleteIn,
+    MusicBatchOut,
+    MusicBatchResultOut,
+    MusicBatchUpdateIn,
+    MusicIn,
+    MusicOut,
+    MusicType,
+    MusicUpdateIn,
+)
 from src.zypl_interview.music.service import MusicService
+from src.zypl_interview.music.versions import etag_matches
 
 router = APIRouter(prefix="/music", tags=["music"])
 
@@ -29,18 +62,141 @@ async def add_music(
     )
 
 
+@router.post("/batch", response_model=MusicBatchOut)
+async def add_music_batch(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    music: list[MusicIn],
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> MusicBatchOut:
+    """Add a batch of music objects.
+
+    Takes in a list of mixed music objects and adds them in one transaction.
+    Returns the created ids in input order.
+    """
+    return await music_service.add_music_batch(session, music)
+
+
 @router.get("/", response_model=MusicOut)
 async def get_music(
     music_type: MusicType,
-    session: Annotated[AsyncSession, Depends(get_db_session)],
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_db_read_session)],
     music_service: Annotated[MusicService, Depends(get_music_service)],
     credentials: Annotated[Credentials, Depends(JWTBearer())],
-) -> MusicOut:
-    """Get all music objects.
+    limit: Annotated[
+        int, Query(ge=1, le=config.MUSIC_MAX_PAGE_SIZE)
+    ] = config.MUSIC_PAGE_SIZE,
+    cursor: str | None = None,
+    band_id: int | None = None,
+    album_id: int | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> MusicOut | Response:
+    """Get a page of music objects.
+
+    Pass `next_cursor` of the previous page as `cursor` to get the next one.
+    Albums can be filtered by `band_id` and songs by `album_id`.
+    Responds with 304 if `If-None-Match` matches the current ETag.
+    """
+    etag = await music_service.get_etag(music_type)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if config.MUSIC_FAST_SERIALIZATION:
+        content = await music_service.get_music_json(
+            session,
+            music_type,
+            limit=limit,
+            cursor=cursor,
+            band_id=band_id,
+            album_id=album_id,
+        )
+        return Response(
+            content=content, media_type="application/json", headers={"ETag": etag}
+        )
+
+    response.headers["ETag"] = etag
+    return await music_service.get_music(
+        session,
+        music_type,
+        limit=limit,
+        cursor=cursor,
+        band_id=band_id,
+        album_id=album_id,
+    )
+
 
-    Returns all music objects in the database.
+@router.get(
+    "/bands/{band_id}/discography",
+    response_model=DiscographyOut,
+    response_class=StreamingResponse,
+)
+async def get_discography(
+    band_id: int,
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Get a band with its albums and their songs.
+
+    The json is streamed, so large discographies aren't built in memory.
+    Responds with 304 if `If-None-Match` matches the current ETag.
+    """
+    etag = await music_service.get_etag(*MusicType)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def content() -> AsyncIterator[bytes]:
+        # The request session is gone once streaming starts, use an own one.
+        async with get_db_read_context_session() as session:
+            async for chunk in music_service.get_discography(session, band_id):
+                yield chunk
+
+    chunks = content()
+    # Raises 404 for a missing band before the response starts.
+    first = await anext(chunks)
+    return StreamingResponse(
+        _prepend(first, chunks), media_type="application/json", headers={"ETag": etag}
+    )
+
+
+@router.get("/export")
+async def export_music(
+    music_type: MusicType,
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    format: ExportFormat = ExportFormat.ndjson,
+    compress: bool = False,
+) -> StreamingResponse:
+    """Export all music objects of a type.
+
+    Streams the whole table as ndjson or csv, optionally gzip encoded.
     """
-    return await music_service.get_music(session, music_type)
+
+    async def content() -> AsyncIterator[bytes]:
+        # The request session is gone once streaming starts, use an own one.
+        async with get_db_read_context_session() as session:
+            async for chunk in music_service.export_music(
+                session, music_type, format, compress
+            ):
+                yield chunk
+
+    filename = f"{music_type.lower()}s.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    media_type = "application/x-ndjson" if format == ExportFormat.ndjson else "text/csv"
+    return StreamingResponse(content(), media_type=media_type, headers=headers)
+
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def get_cache_stats(
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> CacheStats:
+    """Get hit and miss counters of the music cache."""
+    return await music_service.get_cache_stats()
 
 
 @router.patch("/", response_model=MusicOut)
@@ -81,15 +237,80 @@ async def delete_music(
     )
 
 
-@router.post("/csv_upload")
+@router.patch("/batch", response_model=MusicBatchResultOut)
+async def update_music_batch(
+    update_data: MusicBatchUpdateIn,
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> MusicBatchResultOut:
+    """Update a batch of music objects.
+
+    Takes in id and new name pairs and renames them in one transaction.
+    Returns updated ids and ids that were not found.
+    """
+    return await music_service.update_music_batch(session, update_data)
+
+
+@router.delete("/batch", response_model=MusicBatchResultOut)
+async def delete_music_batch(
+    delete_data: MusicBatchDeleteIn,
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    music_service: Annotated[MusicService, Depends(get_music_service)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> MusicBatchResultOut:
+    """Delete a batch of music objects.
+
+    Takes in a list of ids and deletes them in one transaction.
+    Returns deleted ids and ids that were not found.
+    """
+    return await music_service.delete_music_batch(session, delete_data)
+
+
+@router.post("/csv_upload", response_model=CsvUploadOut)
 async def upload_csv(
     session: Annotated[AsyncSession, Depends(get_db_session)],
     music_service: Annotated[MusicService, Depends(get_music_service)],
     credentials: Annotated[Credentials, Depends(JWTBearer())],
     file: Annotated[UploadFile, File(description=".csv")] = None,
-) -> dict[str, str]:
+    mode: IngestMode = IngestMode.skip,
+) -> CsvUploadOut:
     """Upload music data from a csv file.
 
-    Takes in a csv file and uploads the data to the database.
+    Takes in a csv file and uploads the data to the database in chunks.
+    Songs that already exist are skipped or rejected by `mode`.
+    Returns the number of inserted, skipped and rejected rows.
     """
-    return await music_service.insert_songs_from_csv_file(session, file)
+    return await music_service.insert_songs_from_csv_file(session, file, mode)
+
+
+@router.post("/csv_upload/jobs", response_model=IngestJobOut, status_code=202)
+async def submit_csv_upload_job(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    file: Annotated[UploadFile, File(description=".csv")] = None,
+    mode: IngestMode = IngestMode.skip,
+) -> IngestJobOut:
+    """Upload a large csv file for background ingest.
+
+    The file is spooled to disk and ingested by a background worker.
+    Returns the job, use its id to poll the job status.
+    """
+    if file.content_type != "text/csv":
+        raise HTTPException(status_code=422, detail="Wrong file format")
+
+    return await ingest_jobs.submit(file.file, mode)
+
+
+@router.get("/csv_upload/jobs/{job_id}", response_model=IngestJobOut)
+async def get_csv_upload_job(
+    job_id: str,
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> IngestJobOut:
+    """Get status and progress of a background csv ingest job."""
+    return await ingest_jobs.get(job_id)
+
+
+async def _prepend(first: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in chunks:
+        yield chunk
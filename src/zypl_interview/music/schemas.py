@@ -1,5 +1,6 @@
 """This module contains the schemas for music module."""
 
+from datetime import datetime
 from enum import StrEnum
 
 from pydantic import BaseModel
@@ -11,6 +12,11 @@ class MusicType(StrEnum):
     band = "Band"
 
 
+class ExportFormat(StrEnum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class BandIn(BaseModel):
     name: str
 
@@ -50,13 +56,104 @@ class SongOut(BaseModel):
     album_id: int
 
 
+class AlbumWithSongsOut(AlbumOut):
+    songs: list[SongOut]
+
+
+class DiscographyOut(BandOut):
+    albums: list[AlbumWithSongsOut]
+
+
 class MusicOut(BaseModel):
     type: MusicType
 
     data: list[BandOut | AlbumOut | SongOut]
 
+    next_cursor: str | None = None
+
+
+class MusicBatchItemOut(BaseModel):
+    type: MusicType
+    id: int
+
+
+class MusicBatchOut(BaseModel):
+    data: list[MusicBatchItemOut]
+
 
 class MusicUpdateIn(BaseModel):
     type: MusicType
     new_name: str
     music_id: int
+
+
+class CsvRowError(BaseModel):
+    line: int
+    reason: str
+
+
+class IngestMode(StrEnum):
+    insert = "insert"
+    """Plain insert, rows that already exist are rejected."""
+    skip = "skip"
+    """Rows that already exist are skipped."""
+
+
+class CsvUploadOut(BaseModel):
+    inserted: int = 0
+    skipped: int = 0
+    rejected: int = 0
+
+    errors: list[CsvRowError] = []
+
+    @property
+    def rows(self) -> int:
+        """Number of csv rows accounted for."""
+        return self.inserted + self.skipped + self.rejected
+
+
+class IngestJobStatus(StrEnum):
+    queued = "queued"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+
+
+class IngestJobOut(BaseModel):
+    id: str
+    status: IngestJobStatus
+    mode: IngestMode
+
+    rows_processed: int = 0
+    rows_failed: int = 0
+    rows_per_second: float = 0
+    summary: CsvUploadOut = CsvUploadOut()
+    error: str | None = None
+    """Reason the whole job failed."""
+
+    created_at: datetime
+    updated_at: datetime
+
+
+class MusicRenameIn(BaseModel):
+    music_id: int
+    new_name: str
+
+
+class MusicBatchUpdateIn(BaseModel):
+    type: MusicType
+
+    data: list[MusicRenameIn]
+
+
+class MusicBatchDeleteIn(BaseModel):
+    type: MusicType
+
+    ids: list[int]
+
+
+class MusicBatchResultOut(BaseModel):
+    type: MusicType
+
+    affected: list[int]
+    not_found: list[int]
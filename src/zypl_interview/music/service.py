@@ -1,35 +1,75 @@
 """This module contains the service layer for the music module."""
 
 import csv
+import io
+import itertools
 import logging
-from typing import Type
+import zlib
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from typing import BinaryIO, ClassVar
 
 from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.zypl_interview import serialization
+from src.zypl_interview.cache import CacheBackend, CacheStats
+from src.zypl_interview.config import config
+from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.music.cache import MusicCache
 from src.zypl_interview.music.models import Album, Band, Song
 from src.zypl_interview.music.repository import MusicRepository
 from src.zypl_interview.music.schemas import (
+    AlbumIn,
     AlbumOut,
+    BandIn,
     BandOut,
+    CsvRowError,
+    CsvUploadOut,
+    ExportFormat,
+    IngestMode,
+    MusicBatchDeleteIn,
+    MusicBatchItemOut,
+    MusicBatchOut,
+    MusicBatchResultOut,
+    MusicBatchUpdateIn,
     MusicIn,
     MusicOut,
     MusicType,
+    SongIn,
     SongOut,
 )
-from src.zypl_interview.subscriptions.service import SubscriptionService
+from src.zypl_interview.pagination import decode_cursor, encode_cursor
+from src.zypl_interview.subscriptions.outbox import OutboxDispatcher
 
 logger = logging.getLogger(__name__)
 
+MAX_ALBUM_ID = 2**31 - 1
+"""Album ids are postgres `integer`, larger ones fail the whole query."""
+
 
 class MusicService:
+    _input_types: ClassVar[
+        dict[MusicType, type[BandIn] | type[AlbumIn] | type[SongIn]]
+    ] = {
+        MusicType.band: BandIn,
+        MusicType.album: AlbumIn,
+        MusicType.song: SongIn,
+    }
+
     def __init__(
         self,
         music_repository: MusicRepository,
-        subscription_service: SubscriptionService,
+        outbox_dispatcher: OutboxDispatcher,
+        music_cache: MusicCache,
+        album_ids_cache: CacheBackend,
     ) -> None:
         self.mus_repository = music_repository
-        self.subscription_service = subscription_service
+        self.outbox_dispatcher = outbox_dispatcher
+        self.music_cache = music_cache
+        self.album_ids_cache = album_ids_cache
 
     async def add_music(self, session: AsyncSession, music: MusicIn) -> MusicOut:
         """Add a new music object to db."""
@@ -56,9 +96,8 @@ class MusicService:
                 music.data.name,
                 music.data.band_id,
             )
-            await self.subscription_service.check_subscriptions(
-                session, result.band_id, result.id
-            )
+            self.album_ids_cache.set(result.id, True)
+            self.outbox_dispatcher.wake()
             return MusicOut(
                 type=MusicType.album,
                 data=[
@@ -89,21 +128,226 @@ class MusicService:
 
         raise HTTPException(status_code=422, detail="Wrong input data")
 
-    async def get_music(self, session: AsyncSession, music_type: MusicType) -> MusicOut:
-        """Get music objects from db."""
+    async def add_music_batch(
+        self, session: AsyncSession, music: list[MusicIn]
+    ) -> MusicBatchOut:
+        """Add a batch of music objects to db in one transaction."""
+        logger.debug("Adding batch of %s music objects", len(music))
+
+        if len(music) > config.MUSIC_MAX_BATCH_SIZE:
+            raise HTTPException(status_code=422, detail="Batch is too large")
+
+        rows: dict[MusicType, list[dict[str, int | str]]] = {
+            music_type: [] for music_type in MusicType
+        }
+        for index, item in enumerate(music):
+            if type(item.data) is not self._input_types[item.type]:
+                raise HTTPException(
+                    status_code=422, detail=f"Wrong input data at index {index}"
+                )
+            rows[item.type].append(item.data.model_dump())
 
-        referense_type = await self._return_music_type(music_type)
+        band_ids, album_ids, song_ids = await self.mus_repository.add_music_batch(
+            session,
+            rows[MusicType.band],
+            rows[MusicType.album],
+            rows[MusicType.song],
+        )
+
+        for album_id in album_ids:
+            self.album_ids_cache.set(album_id, True)
+        if album_ids:
+            self.outbox_dispatcher.wake()
+
+        ids = {
+            MusicType.band: iter(band_ids),
+            MusicType.album: iter(album_ids),
+            MusicType.song: iter(song_ids),
+        }
+        return MusicBatchOut(
+            data=[
+                MusicBatchItemOut(type=item.type, id=next(ids[item.type]))
+                for item in music
+            ]
+        )
+
+    async def get_music(
+        self,
+        session: AsyncSession,
+        music_type: MusicType,
+        limit: int = config.MUSIC_PAGE_SIZE,
+        cursor: str | None = None,
+        band_id: int | None = None,
+        album_id: int | None = None,
+    ) -> MusicOut:
+        """Get a page of music objects from db.
 
-        music = await self.mus_repository.get_music(session, referense_type)
+        Pages are keyed on id, so every page costs the same as the first one.
+        """
+        referense_type = await self._return_music_type(music_type)
+        parent_id = await self._return_parent_id(music_type, band_id, album_id)
+        limit = min(limit, config.MUSIC_MAX_PAGE_SIZE)
+
+        cache_key = self.music_cache.key(music_type, limit, cursor, parent_id)
+        if (cached := self.music_cache.get(cache_key)) is not None:
+            return cached
+
+        music = await self.mus_repository.get_music(
+            session,
+            referense_type,
+            limit + 1,
+            after_id=decode_cursor(cursor),
+            parent_id=parent_id,
+        )
 
-        logger.debug("Getting music by id")
+        logger.debug("Getting music page")
 
         if music is None:
             raise HTTPException(status_code=404, detail="Music not found")
 
+        music, next_cursor = self._split_page(music, limit)
         data = await self._format_output_data(music)
 
-        return MusicOut(type=music_type, data=data)
+        result = MusicOut(type=music_type, data=data, next_cursor=next_cursor)
+        self.music_cache.set(cache_key, result)
+        return result
+
+    async def get_music_json(
+        self,
+        session: AsyncSession,
+        music_type: MusicType,
+        limit: int = config.MUSIC_PAGE_SIZE,
+        cursor: str | None = None,
+        band_id: int | None = None,
+        album_id: int | None = None,
+    ) -> bytes:
+        """Get a page of music objects encoded as `MusicOut` json.
+
+        Selects plain column tuples and encodes them directly, without
+        building ORM objects or pydantic models.
+        """
+        referense_type = await self._return_music_type(music_type)
+        parent_id = await self._return_parent_id(music_type, band_id, album_id)
+        limit = min(limit, config.MUSIC_MAX_PAGE_SIZE)
+
+        cache_key = self.music_cache.key(music_type, "json", limit, cursor, parent_id)
+        if (cached := self.music_cache.get(cache_key)) is not None:
+            return cached
+
+        rows = await self.mus_repository.get_music_rows(
+            session,
+            referense_type,
+            limit + 1,
+            after_id=decode_cursor(cursor),
+            parent_id=parent_id,
+        )
+
+        logger.debug("Getting music page as json")
+
+        rows, next_cursor = self._split_page(rows, limit)
+        result = serialization.dumps(
+            {
+                "type": music_type,
+                "data": [row._asdict() for row in rows],
+                "next_cursor": next_cursor,
+            }
+        )
+        self.music_cache.set(cache_key, result)
+        return result
+
+    async def get_discography(
+        self, session: AsyncSession, band_id: int
+    ) -> AsyncIterator[bytes]:
+        """Stream a band with all of its albums and songs as `DiscographyOut` json.
+
+        Albums and songs come from a server side cursor `EXPORT_FETCH_SIZE`
+        rows at a time, so memory stays flat however large the band is.
+        The band is read before the first chunk, so a missing band fails
+        before anything is sent.
+        """
+        band = await self.mus_repository.get_band(session, band_id)
+
+        logger.debug("Getting discography of band %s", band_id)
+
+        if band is None:
+            raise HTTPException(status_code=404, detail="Band not found")
+
+        yield self._open_json({"id": band.id, "name": band.name}, "albums")
+
+        album_id = None
+        async for rows in self.mus_repository.stream_discography_rows(
+            session, band_id, config.EXPORT_FETCH_SIZE
+        ):
+            chunks = []
+            for row in rows:
+                if row.id != album_id:
+                    if album_id is not None:
+                        chunks.append(b"]},")
+                    album = {"id": row.id, "name": row.name, "band_id": band_id}
+                    chunks.append(self._open_json(album, "songs"))
+                    album_id = row.id
+                elif row.song_id is not None:
+                    chunks.append(b",")
+                if row.song_id is not None:
+                    song = {
+                        "id": row.song_id,
+                        "name": row.song_name,
+                        "album_id": row.id,
+                    }
+                    chunks.append(serialization.dumps(song))
+            yield b"".join(chunks)
+
+        yield b"]}]}" if album_id is not None else b"]}"
+
+    async def export_music(
+        self,
+        session: AsyncSession,
+        music_type: MusicType,
+        export_format: ExportFormat,
+        compress: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """Stream every music object of a type as ndjson or csv.
+
+        Rows come from a server side cursor `EXPORT_FETCH_SIZE` at a time,
+        so memory stays flat regardless of the table size.
+        """
+        reference_type = await self._return_music_type(music_type)
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+
+        logger.debug("Exporting %s as %s", music_type, export_format)
+
+        if export_format == ExportFormat.csv:
+            columns = [column.name for column in reference_type.__table__.columns]
+            chunks = [self._encode_csv([columns])]
+        else:
+            chunks = []
+
+        async for rows in self.mus_repository.stream_music_rows(
+            session, reference_type, config.EXPORT_FETCH_SIZE
+        ):
+            if export_format == ExportFormat.csv:
+                chunks.append(self._encode_csv(rows))
+            else:
+                chunks.extend(
+                    serialization.dumps(row._asdict()) + b"\n" for row in rows
+                )
+
+            chunk = b"".join(chunks)
+            chunks.clear()
+            yield compressor.compress(chunk) if compressor else chunk
+
+        if compressor:
+            yield compressor.compress(b"".join(chunks)) + compressor.flush()
+        elif chunks:
+            yield b"".join(chunks)
+
+    async def get_etag(self, *music_types: MusicType) -> str:
+        """Get ETag of reads that depend on the given music types."""
+        return self.music_cache.versions.etag(*music_types)
+
+    async def get_cache_stats(self) -> CacheStats:
+        """Get hit and miss counters of the music cache."""
+        return self.music_cache.stats()
 
     async def update_music(
         self, session: AsyncSession, music_type: MusicType, music_id: int, new_name: str
@@ -132,35 +376,276 @@ class MusicService:
         reference_type = await self._return_music_type(music_type)
 
         await self.mus_repository.delete_music(session, reference_type, music_id)
+        if music_type == MusicType.album:
+            self.album_ids_cache.delete(music_id)
 
         logger.debug("Deleting music")
 
         return {"message": "Music object deleted successfully"}
 
+    async def update_music_batch(
+        self, session: AsyncSession, update_data: MusicBatchUpdateIn
+    ) -> MusicBatchResultOut:
+        """Rename a batch of music objects in one statement."""
+        reference_type = await self._return_music_type(update_data.type)
+        if len(update_data.data) > config.MUSIC_MAX_BATCH_SIZE:
+            raise HTTPException(status_code=422, detail="Batch is too large")
+
+        new_names = {item.music_id: item.new_name for item in update_data.data}
+        updated = await self.mus_repository.update_music_batch(
+            session, reference_type, new_names
+        )
+
+        logger.debug("Updated %s music objects", len(updated))
+
+        return MusicBatchResultOut(
+            type=update_data.type,
+            affected=updated,
+            not_found=sorted(new_names.keys() - set(updated)),
+        )
+
+    async def delete_music_batch(
+        self, session: AsyncSession, delete_data: MusicBatchDeleteIn
+    ) -> MusicBatchResultOut:
+        """Delete a batch of music objects in one statement."""
+        reference_type = await self._return_music_type(delete_data.type)
+        if len(delete_data.ids) > config.MUSIC_MAX_BATCH_SIZE:
+            raise HTTPException(status_code=422, detail="Batch is too large")
+
+        music_ids = list(dict.fromkeys(delete_data.ids))
+        deleted = await self.mus_repository.delete_music_batch(
+            session, reference_type, music_ids
+        )
+        if delete_data.type == MusicType.album:
+            for album_id in deleted:
+                self.album_ids_cache.delete(album_id)
+
+        logger.debug("Deleted %s music objects", len(deleted))
+
+        return MusicBatchResultOut(
+            type=delete_data.type,
+            affected=deleted,
+            not_found=sorted(set(music_ids) - set(deleted)),
+        )
+
     async def insert_songs_from_csv_file(
         self,
         session: AsyncSession,
         file: UploadFile,
-    ) -> str:
-        """Make sure that albums with such ID exist before inserting."""
+        mode: IngestMode = IngestMode.skip,
+    ) -> CsvUploadOut:
+        """Stream songs from a csv file into db.
+
+        The upload is parsed incrementally and written chunk by chunk,
+        so memory stays bounded by `CSV_CHUNK_SIZE` instead of the file size.
+        """
         if file.content_type != "text/csv":
             raise HTTPException(status_code=422, detail="Wrong file format")
 
-        content = await file.read()
-        content = content.decode("utf-8").splitlines()
+        return await self.ingest_songs_csv(session, file.file, mode=mode)
+
+    async def ingest_songs_csv(
+        self,
+        session: AsyncSession,
+        stream: BinaryIO,
+        mode: IngestMode = IngestMode.skip,
+        summary: CsvUploadOut | None = None,
+        on_chunk: Callable[[CsvUploadOut], Awaitable[None]] | None = None,
+    ) -> CsvUploadOut:
+        """Insert songs from a binary csv stream with `album_id,name` columns.
+
+        Songs that already exist are handled according to `mode`, so with
+        `skip` a retried upload doesn't duplicate songs.
+        Passing a summary of a previous run resumes the ingest after the rows
+        it already accounts for. `on_chunk` is awaited after every chunk.
+        """
+        summary = summary or CsvUploadOut()
+        text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        reader = csv.reader(text)
+
+        try:
+            # Parsing is blocking file io, keep it off the event loop.
+            await run_in_threadpool(self._skip_csv_rows, reader, 1 + summary.rows)
+
+            while chunk := await run_in_threadpool(
+                self._read_csv_chunk, reader, config.CSV_CHUNK_SIZE
+            ):
+                songs, lines = self._parse_song_rows(chunk, summary)
+                songs, lines = self._dedupe_song_rows(songs, lines, summary, mode)
+                songs, lines = await self._check_album_ids(
+                    session, songs, lines, summary
+                )
+                if songs:
+                    logger.debug("Adding %s songs up to line %s", len(songs), lines[-1])
+                    await self._add_song_chunk(session, songs, lines, summary, mode)
+
+                if on_chunk is not None:
+                    await on_chunk(summary)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise CustomBaseError(
+                f"Malformed csv at line {reader.line_num}", status_code=422
+            ) from e
+        finally:
+            text.detach()
+
+        return summary
+
+    async def _add_song_chunk(
+        self,
+        session: AsyncSession,
+        songs: list[dict[str, int | str]],
+        lines: list[int],
+        summary: CsvUploadOut,
+        mode: IngestMode,
+    ) -> None:
+        """Insert a chunk of songs, rejecting its rows if db refuses them.
+
+        Known album ids are cached per process, so an album deleted by
+        another worker fails the chunk. It is then checked against db and
+        retried once.
+        """
+        for retry in (False, True):
+            try:
+                inserted = await self.mus_repository.add_songs(session, songs, mode)
+            except CustomBaseError:
+                if retry:
+                    break
+                for album_id in {song["album_id"] for song in songs}:
+                    self.album_ids_cache.delete(album_id)
+                songs, lines = await self._check_album_ids(
+                    session, songs, lines, summary
+                )
+                if not songs:
+                    return
+                continue
+
+            summary.inserted += inserted
+            summary.skipped += len(songs) - inserted
+            return
+
+        for line in lines:
+            self._reject_row(summary, line, "Rejected by database")
+
+    async def _check_album_ids(
+        self,
+        session: AsyncSession,
+        songs: list[dict[str, int | str]],
+        lines: list[int],
+        summary: CsvUploadOut,
+    ) -> tuple[list[dict[str, int | str]], list[int]]:
+        """Reject songs of albums that don't exist before they reach an insert."""
+        unchecked = {
+            album_id
+            for album_id in {song["album_id"] for song in songs}
+            if self.album_ids_cache.get(album_id) is None
+        }
+        if not unchecked:
+            return songs, lines
+
+        existing = await self.mus_repository.get_existing_album_ids(
+            session, list(unchecked)
+        )
+        for album_id in existing:
+            self.album_ids_cache.set(album_id, True)
+        if len(existing) == len(unchecked):
+            return songs, lines
+
+        valid_songs = []
+        valid_lines = []
+        for song, line in zip(songs, lines, strict=True):
+            album_id = song["album_id"]
+            if album_id in existing or album_id not in unchecked:
+                valid_songs.append(song)
+                valid_lines.append(line)
+            else:
+                self._reject_row(summary, line, f"Album {album_id} doesn't exist")
+        return valid_songs, valid_lines
 
-        csv_reader = csv.reader(content)
-        next(csv_reader)
+    @classmethod
+    def _open_json(cls, obj: dict[str, int | str], list_field: str) -> bytes:
+        """Encode an object up to the opening of a list field added after it."""
+        return serialization.dumps(obj)[:-1] + f',"{list_field}":['.encode()
 
-        for row in csv_reader:
-            song_name = row[1]
-            album_id = int(row[0])
-            logger.debug('Adding song "%s" to album with id %s', song_name, album_id)
-            await self.mus_repository.add_song(session, song_name, album_id)
-        return {"message": "Songs added successfully"}
+    @classmethod
+    def _encode_csv(cls, rows: list[Row] | list[list[str]]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
 
     @classmethod
-    async def _return_music_type(cls, type: MusicType) -> Type[Song | Album | Band]:
+    def _skip_csv_rows(cls, reader: Iterator[list[str]], count: int) -> None:
+        deque(itertools.islice(reader, count), maxlen=0)
+
+    @classmethod
+    def _read_csv_chunk(
+        cls,
+        reader: Iterator[list[str]],
+        size: int,
+    ) -> list[tuple[int, list[str]]]:
+        return [(reader.line_num, row) for row in itertools.islice(reader, size)]
+
+    @classmethod
+    def _parse_song_rows(
+        cls,
+        chunk: list[tuple[int, list[str]]],
+        summary: CsvUploadOut,
+    ) -> tuple[list[dict[str, int | str]], list[int]]:
+        songs = []
+        lines = []
+        for line, row in chunk:
+            if len(row) != 2:
+                cls._reject_row(summary, line, "Expected 2 columns")
+                continue
+
+            album_id, song_name = row
+            album_id = album_id.strip()
+            # isdigit() also accepts digits like "²" that int() can't parse.
+            if not (album_id.isascii() and album_id.isdecimal()):
+                cls._reject_row(summary, line, "Album id is not a number")
+                continue
+            if int(album_id) > MAX_ALBUM_ID:
+                cls._reject_row(summary, line, f"Album {album_id} doesn't exist")
+                continue
+            if not song_name:
+                cls._reject_row(summary, line, "Song name is empty")
+                continue
+
+            songs.append({"album_id": int(album_id), "name": song_name})
+            lines.append(line)
+        return songs, lines
+
+    @classmethod
+    def _dedupe_song_rows(
+        cls,
+        songs: list[dict[str, int | str]],
+        lines: list[int],
+        summary: CsvUploadOut,
+        mode: IngestMode,
+    ) -> tuple[list[dict[str, int | str]], list[int]]:
+        """Drop repeated songs of a chunk, a statement can't touch a row twice."""
+        seen = set()
+        unique_songs = []
+        unique_lines = []
+        for song, line in zip(songs, lines, strict=True):
+            key = song["album_id"], song["name"]
+            if key not in seen:
+                seen.add(key)
+                unique_songs.append(song)
+                unique_lines.append(line)
+            elif mode == IngestMode.insert:
+                cls._reject_row(summary, line, "Duplicate song")
+            else:
+                summary.skipped += 1
+        return unique_songs, unique_lines
+
+    @classmethod
+    def _reject_row(cls, summary: CsvUploadOut, line: int, reason: str) -> None:
+        summary.rejected += 1
+        if len(summary.errors) < config.CSV_MAX_REPORTED_ERRORS:
+            summary.errors.append(CsvRowError(line=line, reason=reason))
+
+    @classmethod
+    async def _return_music_type(cls, type: MusicType) -> type[Song | Album | Band]:
         if type == MusicType.band:
             return Band
         elif type == MusicType.album:
@@ -170,12 +655,36 @@ class MusicService:
         else:
             raise HTTPException(status_code=422, detail="Wrong input data")
 
+    @classmethod
+    def _split_page(
+        cls, rows: list[Band | Album | Song | Row], limit: int
+    ) -> tuple[list[Band | Album | Song | Row], str | None]:
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+
+    @classmethod
+    async def _return_parent_id(
+        cls,
+        type: MusicType,
+        band_id: int | None,
+        album_id: int | None,
+    ) -> int | None:
+        if band_id is not None and type != MusicType.album:
+            raise HTTPException(status_code=422, detail="band_id filters albums only")
+        if album_id is not None and type != MusicType.song:
+            raise HTTPException(status_code=422, detail="album_id filters songs only")
+        return band_id if band_id is not None else album_id
+
     @classmethod
     async def _format_output_data(
         cls,
         music: list[Band | Album | Song],
     ) -> list[BandOut | AlbumOut | SongOut]:
         data = []
+        if not music:
+            return data
         if type(music[0]) is Band:
             for band in music:
                 data.append(
@@ -0,0 +1,147 @@
+"""This module contains write counters of the music tables.
+
+Versions live in the `music_versions` table and are bumped in the
+transaction of every write, so all workers agree on them. Every worker
+keeps a copy, so building an ETag never waits for a query.
+
+Bumped versions are sent to the `VERSIONS_CHANNEL` postgres channel with
+NOTIFY in the same transaction. Every worker LISTENs on a dedicated
+connection and applies them once the write commits. After (re)connecting
+the versions are reloaded, so writes missed while disconnected are seen
+at most `MUSIC_VERSIONS_SYNC_INTERVAL` seconds late.
+"""
+
+import asyncio
+import logging
+from collections.abc import Mapping
+
+import asyncpg
+from sqlalchemy import String, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import DB_URL, get_db_context_session
+from src.zypl_interview.music.models import MusicVersion
+from src.zypl_interview.music.schemas import MusicType
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_CHANNEL = "music_versions"
+
+
+class MusicVersions:
+    """Per music type version counters, bumped on every write."""
+
+    def __init__(self, dsn: str, sync_interval: float) -> None:
+        self.dsn = dsn
+        self.sync_interval = sync_interval
+        self._versions = dict.fromkeys(MusicType, 0)
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get(self, music_type: MusicType) -> int:
+        return self._versions[music_type]
+
+    async def bump(
+        self, session: AsyncSession, *music_types: MusicType
+    ) -> dict[MusicType, int]:
+        """Bump versions in the transaction of the session.
+
+        Other workers are notified of the new versions on commit. Returns
+        the new versions, apply them with `update` after the commit.
+        """
+        if not music_types:
+            return {}
+        bumped = (
+            update(MusicVersion)
+            .where(MusicVersion.type.in_(music_types))
+            .values(version=MusicVersion.version + 1)
+            .returning(MusicVersion.type, MusicVersion.version)
+            .cte("bumped")
+        )
+        payload = bumped.c.type + ":" + cast(bumped.c.version, String)
+        stmt = select(
+            bumped.c.type,
+            bumped.c.version,
+            func.pg_notify(VERSIONS_CHANNEL, payload),
+        )
+        result = await session.execute(stmt)
+        return {MusicType(music_type): version for music_type, version, _ in result}
+
+    def update(self, versions: Mapping[MusicType, int]) -> None:
+        """Apply versions read from the database, they never go back."""
+        for music_type, version in versions.items():
+            self._versions[music_type] = max(self._versions[music_type], version)
+
+    def etag(self, *music_types: MusicType) -> str:
+        """Build a strong ETag from versions of the given music types."""
+        versions = "-".join(str(self._versions[t]) for t in music_types)
+        return f'"{versions}"'
+
+    async def sync(self) -> None:
+        async with get_db_context_session() as session:
+            result = await session.execute(
+                select(MusicVersion.type, MusicVersion.version)
+            )
+            self.update(
+                {MusicType(music_type): version for music_type, version in result}
+            )
+
+    def on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        """Apply a `type:version` payload received from the postgres channel."""
+        music_type, _, version = payload.partition(":")
+        try:
+            self.update({MusicType(music_type): int(version)})
+        except ValueError as e:
+            logger.error(e)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                logger.exception("Failed to listen for music versions")
+            await asyncio.sleep(self.sync_interval)
+
+    async def _listen(self) -> None:
+        """Apply versions of the channel until the connection is lost."""
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(VERSIONS_CHANNEL, self.on_notification)
+            # Catch up on writes made before listening.
+            await self.sync()
+            logger.debug("Listening for music versions")
+            await lost.wait()
+            logger.error("Connection of music versions lost")
+        finally:
+            await connection.close()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check `If-None-Match` header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+music_versions = MusicVersions(
+    dsn=DB_URL.set(drivername="postgresql").render_as_string(hide_password=False),
+    sync_interval=config.MUSIC_VERSIONS_SYNC_INTERVAL,
+)
@@ -0,0 +1,26 @@
+"""This module contains helpers for keyset (cursor) pagination."""
+
+import base64
+import binascii
+
+from src.zypl_interview.exceptions import CustomBaseError
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode id of the last row of a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    """Decode cursor back into the id the next page starts after."""
+    if cursor is None:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, last_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise CustomBaseError("Invalid cursor", status_code=400) from e
@@ -2,6 +2,7 @@ from fastapi import APIRouter
 
 from src.zypl_interview.music.routes import router as music_router
 from src.zypl_interview.subscriptions.routes import router as subscription_router
+from src.zypl_interview.system.routes import router as system_router
 from src.zypl_interview.users.routes import router as user_router
 
 
@@ -13,5 +14,6 @@ def router_factory() -> APIRouter:
     router.include_router(user_router)
     router.include_router(subscription_router)
     router.include_router(music_router)
+    router.include_router(system_router)
 
     return router
@@ -0,0 +1,19 @@
+"""This module contains the fast json encoder used for raw responses."""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object of plain python types into json bytes.
+
+    Output matches what `fastapi.responses.JSONResponse` renders.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
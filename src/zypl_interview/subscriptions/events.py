@@ -0,0 +1,185 @@
+"""This module contains the hub of real-time release events.
+
+Listeners are registered per band they follow, so publishing an event only
+touches the listeners of its band and idle listeners cost nothing but their
+registration. Each listener has a bounded queue, events for a listener that
+doesn't keep up are dropped instead of piling up in memory.
+
+Events are sent to the `RELEASES_CHANNEL` postgres channel with NOTIFY in
+the transaction that creates the albums. Every worker's hub LISTENs on a
+dedicated connection, so listeners get events of all workers once the
+transaction commits. Events created while a hub is reconnecting are lost,
+the same as ones dropped from a full queue.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Iterable
+
+import asyncpg
+from pydantic import ValidationError
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import DB_URL
+from src.zypl_interview.serialization import dumps
+from src.zypl_interview.subscriptions.schemas import EventHubMetrics, ReleaseEventOut
+
+logger = logging.getLogger(__name__)
+
+RELEASES_CHANNEL = "album_releases"
+
+MAX_PAYLOAD_SIZE = 7999
+"""Longest NOTIFY payload in bytes postgres accepts."""
+
+
+class Listener:
+    """Connection waiting for events of the bands a user follows.
+
+    A slimmer `asyncio.Queue`, a waiter future exists only while the
+    connection is waiting for an event.
+    """
+
+    __slots__ = ("_events", "_waiter", "band_ids", "dropped", "queue_size")
+
+    def __init__(self, band_ids: Iterable[int], queue_size: int) -> None:
+        self.band_ids = tuple(set(band_ids))
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._events: deque[bytes] = deque()
+        self._waiter: asyncio.Future | None = None
+
+    def put(self, payload: bytes) -> bool:
+        """Add an event, returns False if the queue is full."""
+        if len(self._events) >= self.queue_size:
+            self.dropped += 1
+            return False
+        self._events.append(payload)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        return True
+
+    async def get(self) -> bytes:
+        while not self._events:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._events.popleft()
+
+
+class EventHub:
+    """Routes release events to listeners of their band."""
+
+    def __init__(self, queue_size: int, dsn: str, reconnect_interval: float) -> None:
+        self.queue_size = queue_size
+        self.dsn = dsn
+        self.reconnect_interval = reconnect_interval
+        self._listeners_by_band: dict[int, set[Listener]] = {}
+        self._listeners = 0
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def connect(self, band_ids: Iterable[int]) -> Listener:
+        listener = Listener(band_ids, self.queue_size)
+        for band_id in listener.band_ids:
+            self._listeners_by_band.setdefault(band_id, set()).add(listener)
+        self._listeners += 1
+        return listener
+
+    def disconnect(self, listener: Listener) -> None:
+        for band_id in listener.band_ids:
+            listeners = self._listeners_by_band.get(band_id)
+            if listeners is None:
+                continue
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners_by_band[band_id]
+        self._listeners -= 1
+
+    def publish(self, event: ReleaseEventOut) -> None:
+        """Send an event to listeners of its band, never blocks."""
+        self._published += 1
+        listeners = self._listeners_by_band.get(event.band_id)
+        if not listeners:
+            return
+
+        # Encoded once, every listener gets the same bytes.
+        payload = dumps(event.model_dump())
+        for listener in listeners:
+            if listener.put(payload):
+                self._delivered += 1
+            else:
+                self._dropped += 1
+
+    def on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        """Publish an event received from the postgres channel."""
+        try:
+            event = ReleaseEventOut.model_validate_json(payload)
+        except ValidationError as e:
+            logger.error(e)
+            return
+        self.publish(event)
+
+    def metrics(self) -> EventHubMetrics:
+        return EventHubMetrics(
+            listeners=self._listeners,
+            bands=len(self._listeners_by_band),
+            events_published=self._published,
+            events_delivered=self._delivered,
+            events_dropped=self._dropped,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except Exception:
+                logger.exception("Failed to listen for release events")
+            await asyncio.sleep(self.reconnect_interval)
+
+    async def _listen(self) -> None:
+        """Publish events of the channel until the connection is lost."""
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(RELEASES_CHANNEL, self.on_notification)
+            logger.debug("Listening for release events")
+            await lost.wait()
+            logger.error("Connection of release events lost")
+        finally:
+            await connection.close()
+
+
+def encode_release_event(band_id: int, album_id: int, name: str) -> str | None:
+    """Encode a NOTIFY payload of a release event.
+
+    Returns None if the payload is too long to be sent.
+    """
+    payload = dumps({"band_id": band_id, "album_id": album_id, "name": name})
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        logger.warning("Release event of album %s is too long to be sent", album_id)
+        return None
+    return payload.decode()
+
+
+event_hub = EventHub(
+    queue_size=config.EVENTS_QUEUE_SIZE,
+    dsn=DB_URL.set(drivername="postgresql").render_as_string(hide_password=False),
+    reconnect_interval=config.EVENTS_RECONNECT_INTERVAL,
+)
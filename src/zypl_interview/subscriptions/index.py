@@ -0,0 +1,132 @@
+"""This module contains the in-memory index of subscriptions.
+
+Subscriptions are kept as sorted arrays of ints in both directions, band id
+to user ids and user id to band ids. Lookups are binary searches, without
+a round trip to the database.
+
+The index is only read from, writes always go to the database. Changes of
+this worker are applied right away, the whole index is reloaded every
+`SUBSCRIBER_INDEX_RELOAD_INTERVAL` seconds to pick up the other workers'.
+"""
+
+import asyncio
+import bisect
+import logging
+from array import array
+from collections import defaultdict
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import get_db_context_session
+from src.zypl_interview.subscriptions.repository import SubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberIndex:
+    """Compact map of bands to subscribers and of users to followed bands."""
+
+    def __init__(
+        self,
+        subscription_repo: SubscriptionRepository,
+        enabled: bool,
+        reload_interval: float,
+    ) -> None:
+        self.subscription_repo = subscription_repo
+        self.enabled = enabled
+        self.reload_interval = reload_interval
+        self.loaded = False
+        self._users_by_band: dict[int, array] = {}
+        self._bands_by_user: dict[int, array] = {}
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        await self.reload()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def reload(self) -> None:
+        """Fill the index from the database.
+
+        Streamed pairs go straight into arrays, the index is replaced once
+        all of them are read.
+        """
+        users_by_band = defaultdict(lambda: array("q"))
+        bands_by_user = defaultdict(lambda: array("q"))
+        count = 0
+        async with get_db_context_session() as session:
+            async for chunk in self.subscription_repo.iter_subscription_pairs(
+                session, config.SUBSCRIBERS_CHUNK_SIZE
+            ):
+                for user_id, band_id in chunk:
+                    users_by_band[band_id].append(user_id)
+                    bands_by_user[user_id].append(band_id)
+                count += len(chunk)
+
+        self._users_by_band = self._sort_arrays(users_by_band)
+        self._bands_by_user = self._sort_arrays(bands_by_user)
+        self.loaded = True
+        logger.debug(f"Loaded {count} subscriptions into the index")
+
+    def add(self, user_id: int, band_id: int) -> None:
+        if not self.loaded:
+            return
+        self._insert(self._users_by_band, band_id, user_id)
+        self._insert(self._bands_by_user, user_id, band_id)
+
+    def remove(self, user_id: int, band_id: int) -> None:
+        if not self.loaded:
+            return
+        self._discard(self._users_by_band, band_id, user_id)
+        self._discard(self._bands_by_user, user_id, band_id)
+
+    def subscribers(self, band_id: int) -> array:
+        """Get sorted ids of users following the band, don't mutate it."""
+        return self._users_by_band.get(band_id, array("q"))
+
+    def bands(self, user_id: int) -> array:
+        """Get sorted ids of bands the user follows, don't mutate it."""
+        return self._bands_by_user.get(user_id, array("q"))
+
+    @classmethod
+    def _sort_arrays(cls, arrays: dict[int, array]) -> dict[int, array]:
+        return {key: array("q", sorted(values)) for key, values in arrays.items()}
+
+    @classmethod
+    def _insert(cls, arrays: dict[int, array], key: int, value: int) -> None:
+        values = arrays.setdefault(key, array("q"))
+        i = bisect.bisect_left(values, value)
+        if i == len(values) or values[i] != value:
+            values.insert(i, value)
+
+    @classmethod
+    def _discard(cls, arrays: dict[int, array], key: int, value: int) -> None:
+        values = arrays.get(key)
+        if values is None:
+            return
+        i = bisect.bisect_left(values, value)
+        if i < len(values) and values[i] == value:
+            del values[i]
+        if not values:
+            del arrays[key]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Failed to reload subscriber index")
+
+
+subscriber_index = SubscriberIndex(
+    SubscriptionRepository(),
+    enabled=config.SUBSCRIBER_INDEX_ENABLED,
+    reload_interval=config.SUBSCRIBER_INDEX_RELOAD_INTERVAL,
+)
@@ -1,4 +1,6 @@
-from src.zypl_interview.integration.email import EmailIntegration
+from src.zypl_interview.integration.email import email_integration
+from src.zypl_interview.subscriptions.events import event_hub
+from src.zypl_interview.subscriptions.index import subscriber_index
 from src.zypl_interview.subscriptions.repository import SubscriptionRepository
 from src.zypl_interview.subscriptions.service import SubscriptionService
 
@@ -6,7 +8,9 @@ from src.zypl_interview.subscriptions.service import SubscriptionService
 async def get_subs_service() -> SubscriptionService:
     """Get SubscriptionService instance."""
     sub_repo = SubscriptionRepository()
-    email_integ = EmailIntegration()
     return SubscriptionService(
-        subscription_repo=sub_repo, email_integration=email_integ
+        subscription_repo=sub_repo,
+        email_integration=email_integration,
+        subscriber_index=subscriber_index,
+        event_hub=event_hub,
     )
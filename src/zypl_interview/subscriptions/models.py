@@ -1,10 +1,13 @@
 """This module contains the sql models for the subscriptions module."""
 
-from sqlalchemy import ForeignKey
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.zypl_interview.database import Base
 from src.zypl_interview.music.models import Band
+from src.zypl_interview.subscriptions.schemas import OutboxStatus
 from src.zypl_interview.users.models import User
 
 
@@ -14,3 +17,47 @@ class Subscription(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_email: Mapped[str] = mapped_column(ForeignKey(User.email), nullable=False)
     band_id: Mapped[int] = mapped_column(ForeignKey(Band.id), nullable=False)
+
+    __table_args__ = (
+        Index("ix_subscriptions_band_id_user_email", band_id, user_email),
+        UniqueConstraint(
+            user_email, band_id, name="uq_subscriptions_user_email_band_id"
+        ),
+    )
+
+
+class OutboxMixin:
+    """Columns of rows claimed and sent by the outbox dispatcher."""
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    """Claims so far, counted when claimed so a crash also uses one up."""
+    status: Mapped[str] = mapped_column(
+        default=OutboxStatus.pending, server_default=OutboxStatus.pending
+    )
+    claimed_until: Mapped[datetime | None] = mapped_column()
+    """End of the lease of the dispatcher sending it, None if unclaimed."""
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class NotificationOutbox(OutboxMixin, Base):
+    """Pending release notification, written with the album it is about."""
+
+    __tablename__ = "notification_outbox"
+
+    band_id: Mapped[int] = mapped_column(nullable=False)
+    album_id: Mapped[int] = mapped_column(nullable=False)
+
+    __table_args__ = (Index("ix_notification_outbox_status_id", "status", "id"),)
+
+
+class EmailRetry(OutboxMixin, Base):
+    """Email of a sent digest that the provider didn't accept."""
+
+    __tablename__ = "email_retries"
+
+    recipient: Mapped[str] = mapped_column(nullable=False)
+    subject: Mapped[str] = mapped_column(nullable=False)
+    body: Mapped[str] = mapped_column(nullable=False)
+
+    __table_args__ = (Index("ix_email_retries_status_id", "status", "id"),)
@@ -0,0 +1,106 @@
+"""This module contains the background fan-out of release notifications.
+
+Notification jobs are put on a queue by the outbox dispatcher. Worker tasks
+take jobs off the queue and send emails with bounded concurrency, so album
+creation never waits for the subscribers of a band to be notified.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import get_db_context_session
+from src.zypl_interview.integration.email import EmailMessage
+from src.zypl_interview.subscriptions.injectors import get_subs_service
+from src.zypl_interview.subscriptions.schemas import NotifierMetrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReleaseNotification:
+    """Notification job about new albums of one or more bands."""
+
+    albums_by_band: dict[int, list[int]]
+    done: asyncio.Future[list[EmailMessage]] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+    """Resolves with the emails the provider didn't accept."""
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class Notifier:
+    """Queue of release notifications drained by background workers."""
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self._queue: asyncio.Queue[ReleaseNotification] = asyncio.Queue(queue_size)
+        self._tasks: list[asyncio.Task] = []
+        self._metrics = NotifierMetrics()
+        self._latency_total = 0.0
+
+    async def start(self) -> None:
+        """Start worker tasks."""
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop worker tasks, jobs still in the queue stay in the outbox."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self, albums_by_band: dict[int, list[int]]
+    ) -> asyncio.Future[list[EmailMessage]]:
+        """Queue a digest of new albums, keyed by band id.
+
+        Waits while the queue is full. Returns a future of the job.
+        """
+        job = ReleaseNotification(albums_by_band)
+        await self._queue.put(job)
+        self._metrics.jobs_enqueued += 1
+        return job.done
+
+    def metrics(self) -> NotifierMetrics:
+        return self._metrics.model_copy(update={"queue_depth": self._queue.qsize()})
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                failed = await self._deliver(job)
+                self._metrics.jobs_done += 1
+                if not job.done.done():
+                    job.done.set_result(failed)
+            except Exception as e:
+                logger.exception("Release notification failed")
+                self._metrics.jobs_failed += 1
+                if not job.done.done():
+                    job.done.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+            latency = time.monotonic() - job.enqueued_at
+            self._latency_total += latency
+            finished = self._metrics.jobs_done + self._metrics.jobs_failed
+            self._metrics.latency_avg = self._latency_total / finished
+            self._metrics.latency_max = max(self._metrics.latency_max, latency)
+
+    async def _deliver(self, job: ReleaseNotification) -> list[EmailMessage]:
+        subscription_service = await get_subs_service()
+        async with get_db_context_session() as session:
+            result = await subscription_service.notify_new_releases(
+                session, job.albums_by_band
+            )
+        self._metrics.emails_sent += result.sent
+        self._metrics.emails_failed += len(result.failed)
+        return result.failed
+
+
+notifier = Notifier(
+    workers=config.NOTIFY_WORKERS,
+    queue_size=config.NOTIFY_QUEUE_SIZE,
+)
@@ -0,0 +1,278 @@
+"""This module contains the dispatcher of the notification outbox.
+
+Release notifications are written to the outbox in the transaction that
+creates the album. Dispatchers claim batches of them for a lease, hand them
+to the notifier and delete them only once sent. The lease is renewed every
+third of it while the rows are being sent, so a slow fan-out isn't claimed
+by another dispatcher. A crash before that leaves them in the outbox and
+they are claimed again once the lease expires, so every notification is
+delivered at least once. Notifications that fail `OUTBOX_MAX_ATTEMPTS`
+times are moved to the dead status.
+
+Up to `max_in_flight` digests are sent at once, each batch is completed or
+released for a retry as soon as its own digest is done.
+
+A digest counts as sent even if some of its email batches failed. Emails of
+those batches are written to the email retries table and sent again on their
+own, so subscribers that got the digest don't get it twice.
+
+Notifications are claimed only once they are older than the digest window.
+A dispatch claims all of them, batch after batch, so releases of a bulk load
+are coalesced into a single digest email per user, whichever worker wrote
+them. Dispatchers of other workers claiming at the same moment can still
+split them.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Coroutine
+from typing import Any
+
+from src.zypl_interview.config import config
+from src.zypl_interview.database import get_db_context_session
+from src.zypl_interview.integration.email import (
+    EmailIntegration,
+    EmailMessage,
+    email_integration,
+)
+from src.zypl_interview.subscriptions.models import EmailRetry, NotificationOutbox
+from src.zypl_interview.subscriptions.notifier import Notifier, notifier
+from src.zypl_interview.subscriptions.repository import SubscriptionRepository
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Moves notifications from the outbox to the notifier."""
+
+    def __init__(
+        self,
+        subscription_repo: SubscriptionRepository,
+        notifier: Notifier,
+        email_integration: EmailIntegration,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        lease: float,
+        digest_window: float,
+        max_in_flight: int,
+    ) -> None:
+        self.subscription_repo = subscription_repo
+        self.notifier = notifier
+        self.email_integration = email_integration
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.digest_window = digest_window
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._completions: set[asyncio.Task] = set()
+        # Rows being sent, their claims are renewed until they are completed.
+        self._claimed: dict[type[NotificationOutbox | EmailRetry], set[int]] = {
+            NotificationOutbox: set(),
+            EmailRetry: set(),
+        }
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._heartbeat: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        self._heartbeat = asyncio.create_task(self._renew_claims())
+
+    async def stop(self) -> None:
+        """Stop dispatching, batches still being sent are claimed again later."""
+        tasks = [*self._completions]
+        for task in (self._task, self._heartbeat):
+            if task is not None:
+                tasks.append(task)
+        self._task = self._heartbeat = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def wake(self) -> None:
+        """Dispatch right away instead of waiting for the next poll.
+
+        Notifications younger than the digest window still wait for it.
+        """
+        self._wakeup.set()
+
+    async def dispatch_batch(self) -> int:
+        """Submit notifications older than the digest window as one digest.
+
+        They are claimed `batch_size` at a time, up to the window cutoff at
+        the start of the dispatch. Waits while `max_in_flight` digests are
+        being sent. The notifications are completed in the background once
+        their digest is done. Returns number of claimed notifications.
+        """
+        await self._in_flight.acquire()
+        try:
+            events = await self._claim_digest()
+            if not events:
+                self._in_flight.release()
+                return 0
+
+            albums_by_band = defaultdict(list)
+            for event in events:
+                albums_by_band[event.band_id].append(event.album_id)
+            job = await self.notifier.submit(dict(albums_by_band))
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+        event_ids = [event.id for event in events]
+        job.add_done_callback(
+            lambda job: self._track(self._complete_digest(event_ids, job))
+        )
+        logger.debug("Dispatched %s notifications", len(events))
+        return len(events)
+
+    async def retry_emails(self) -> int:
+        """Send again a batch of emails the provider didn't accept.
+
+        Returns number of claimed emails.
+        """
+        retries = await self._claim(EmailRetry)
+        if not retries:
+            return 0
+
+        messages = [
+            EmailMessage(retry.recipient, retry.subject, retry.body)
+            for retry in retries
+        ]
+        result = await self.email_integration.send_emails(messages)
+        failed = {id(message) for message in result.failed}
+        sent_ids, failed_ids = [], []
+        for retry, message in zip(retries, messages, strict=True):
+            (failed_ids if id(message) in failed else sent_ids).append(retry.id)
+
+        await self._complete(EmailRetry, sent_ids, failed_ids)
+        logger.debug("Retried %s emails", len(retries))
+        return len(retries)
+
+    async def _claim_digest(self) -> list[NotificationOutbox]:
+        started_at = time.monotonic()
+        events = []
+        while True:
+            # Older by the time spent claiming, so the cutoff doesn't move.
+            min_age = self.digest_window + time.monotonic() - started_at
+            batch = await self._claim(NotificationOutbox, min_age)
+            events += batch
+            if len(batch) < self.batch_size:
+                return events
+
+    async def _claim(
+        self, outbox: type[NotificationOutbox] | type[EmailRetry], min_age: float = 0
+    ) -> list[NotificationOutbox | EmailRetry]:
+        async with get_db_context_session() as session:
+            dead = await self.subscription_repo.expire_outbox_claims(
+                session, outbox, self.max_attempts
+            )
+            rows = await self.subscription_repo.claim_outbox_batch(
+                session,
+                outbox,
+                self.batch_size,
+                self.max_attempts,
+                self.lease,
+                min_age,
+            )
+        self._claimed[outbox].update(row.id for row in rows)
+        self._report_dead(outbox, dead)
+        return rows
+
+    async def _complete(
+        self,
+        outbox: type[NotificationOutbox] | type[EmailRetry],
+        sent_ids: list[int],
+        failed_ids: list[int],
+        failed_emails: list[EmailMessage] | None = None,
+    ) -> None:
+        try:
+            async with get_db_context_session() as session:
+                dead = await self.subscription_repo.complete_outbox_batch(
+                    session,
+                    outbox,
+                    sent_ids,
+                    failed_ids,
+                    self.max_attempts,
+                    failed_emails,
+                )
+        finally:
+            # Not renewed anymore, if completing failed they expire.
+            self._claimed[outbox].difference_update(sent_ids, failed_ids)
+        self._report_dead(outbox, dead)
+
+    async def _complete_digest(
+        self, event_ids: list[int], job: asyncio.Future[list[EmailMessage]]
+    ) -> None:
+        try:
+            if job.cancelled() or job.exception() is not None:
+                # The notifier logged why the job failed.
+                await self._complete(NotificationOutbox, [], event_ids)
+            else:
+                await self._complete(NotificationOutbox, event_ids, [], job.result())
+        except Exception:
+            # Left claimed, the notifications are sent again once it expires.
+            logger.exception("Failed to complete dispatched notifications")
+        finally:
+            self._in_flight.release()
+
+    def _track(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coroutine)
+        self._completions.add(task)
+        task.add_done_callback(self._completions.discard)
+
+    def _report_dead(
+        self, outbox: type[NotificationOutbox] | type[EmailRetry], dead: int
+    ) -> None:
+        if dead:
+            logger.error(
+                f"{dead} rows of {outbox.__tablename__} failed "
+                f"{self.max_attempts} times, moved to the dead status"
+            )
+
+    async def _renew_claims(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            for outbox, ids in self._claimed.items():
+                if not ids:
+                    continue
+                try:
+                    async with get_db_context_session() as session:
+                        await self.subscription_repo.renew_outbox_claims(
+                            session, outbox, list(ids), self.lease
+                        )
+                except Exception:
+                    logger.exception("Failed to renew outbox claims")
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_batch()
+                claimed = max(claimed, await self.retry_emails())
+            except Exception:
+                logger.exception("Failed to dispatch the outbox")
+                claimed = 0
+
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+
+
+outbox_dispatcher = OutboxDispatcher(
+    SubscriptionRepository(),
+    notifier,
+    email_integration,
+    batch_size=config.OUTBOX_BATCH_SIZE,
+    poll_interval=config.OUTBOX_POLL_INTERVAL,
+    max_attempts=config.OUTBOX_MAX_ATTEMPTS,
+    lease=config.OUTBOX_LEASE,
+    digest_window=config.NOTIFY_DIGEST_WINDOW,
+    max_in_flight=config.NOTIFY_WORKERS,
+)
@@ -1,13 +1,39 @@
 """This module contains the sql logic for the subscriptions module."""
 
 import logging
+from collections.abc import AsyncIterator
+from datetime import timedelta
 
-from sqlalchemy import insert, select
+from sqlalchemy import (
+    Integer,
+    Row,
+    any_,
+    bindparam,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import BindParameter
 
 from src.zypl_interview.exceptions import CustomBaseError
-from src.zypl_interview.subscriptions.models import Subscription
+from src.zypl_interview.integration.email import EmailMessage
+from src.zypl_interview.music.models import Band
+from src.zypl_interview.subscriptions.models import (
+    EmailRetry,
+    NotificationOutbox,
+    Subscription,
+)
+from src.zypl_interview.subscriptions.schemas import OutboxStatus
+from src.zypl_interview.users.models import User
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +46,17 @@ class SubscriptionRepository:
         session: AsyncSession,
         user_email: str,
         band_id: int,
-    ) -> Subscription:
+    ) -> Subscription | None:
+        """Insert a subscription, returns None if it already exists."""
         stmt = (
-            insert(
+            pg_insert(
                 Subscription,
             )
             .values(
                 user_email=user_email,
                 band_id=band_id,
             )
+            .on_conflict_do_nothing(constraint="uq_subscriptions_user_email_band_id")
             .returning(Subscription)
         )
         try:
@@ -40,15 +68,316 @@ class SubscriptionRepository:
             await session.rollback()
             raise CustomBaseError("Failed to insert subscription", 500) from e
 
-    async def get_subscriptions_by_band_id(
+    async def insert_subscriptions(
         self,
         session: AsyncSession,
-        band_id: int,
-    ) -> list[Subscription]:
-        stmt = select(Subscription).where(Subscription.band_id == band_id)
+        user_email: str,
+        band_ids: list[int],
+    ) -> list[int]:
+        """Subscribe a user to bands with a single `INSERT ... SELECT`.
+
+        Existing subscriptions and bands that don't exist are skipped.
+        Returns band ids of the inserted rows.
+        """
+        bands = select(literal(user_email), Band.id).where(
+            Band.id == any_(self._ids_param(band_ids))
+        )
+        stmt = (
+            pg_insert(Subscription)
+            .from_select(["user_email", "band_id"], bands)
+            .on_conflict_do_nothing(constraint="uq_subscriptions_user_email_band_id")
+            .returning(Subscription.band_id)
+        )
+        try:
+            result = await session.execute(stmt)
+            await session.commit()
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to insert subscriptions", 500) from e
+
+    async def delete_subscriptions(
+        self,
+        session: AsyncSession,
+        user_email: str,
+        band_ids: list[int],
+    ) -> list[int]:
+        """Unsubscribe a user from bands, returns band ids of deleted rows."""
+        stmt = (
+            delete(Subscription)
+            .where(
+                Subscription.user_email == user_email,
+                Subscription.band_id == any_(self._ids_param(band_ids)),
+            )
+            .returning(Subscription.band_id)
+            .execution_options(synchronize_session=False)
+        )
         try:
             result = await session.execute(stmt)
-            return result.scalars().all()
+            await session.commit()
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to delete subscriptions", 500) from e
+
+    async def get_user_subscriptions(
+        self,
+        session: AsyncSession,
+        user_email: str,
+        limit: int,
+        after_band_id: int | None,
+    ) -> list[int]:
+        """Get a page of band ids the user follows, keyed on band id."""
+        stmt = (
+            select(Subscription.band_id)
+            .where(Subscription.user_email == user_email)
+            .order_by(Subscription.band_id)
+            .limit(limit)
+        )
+        if after_band_id is not None:
+            stmt = stmt.where(Subscription.band_id > after_band_id)
+        try:
+            result = await session.execute(stmt)
+            return list(result.scalars())
         except SQLAlchemyError as e:
             logger.error(e)
             raise CustomBaseError("Failed to get subscriptions", 500) from e
+
+    async def get_band_ids_by_user_email(
+        self,
+        session: AsyncSession,
+        user_email: str,
+    ) -> list[int]:
+        stmt = select(Subscription.band_id).where(Subscription.user_email == user_email)
+        try:
+            result = await session.execute(stmt)
+            return list(result.scalars())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Failed to get subscriptions", 500) from e
+
+    async def iter_subscribers(
+        self,
+        session: AsyncSession,
+        band_ids: list[int],
+        chunk_size: int,
+    ) -> AsyncIterator[list[Row]]:
+        """Stream (user_email, band_id) of band subscribers in chunks.
+
+        Rows come from a server side cursor, ordered by user email.
+        """
+        stmt = (
+            select(Subscription.user_email, Subscription.band_id)
+            .where(Subscription.band_id == any_(self._ids_param(band_ids)))
+            .order_by(Subscription.user_email, Subscription.band_id)
+            .execution_options(yield_per=chunk_size)
+        )
+        try:
+            result = await session.stream(stmt)
+            async for chunk in result.partitions():
+                yield chunk
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Failed to get subscriptions", 500) from e
+
+    async def get_user_emails(
+        self,
+        session: AsyncSession,
+        user_ids: list[int],
+    ) -> dict[int, str]:
+        """Get emails of the given users by id."""
+        stmt = select(User.id, User.email).where(
+            User.id == any_(self._ids_param(user_ids))
+        )
+        try:
+            result = await session.execute(stmt)
+            return dict(result.tuples())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Failed to get users", 500) from e
+
+    async def iter_subscription_pairs(
+        self,
+        session: AsyncSession,
+        chunk_size: int,
+    ) -> AsyncIterator[list[Row]]:
+        """Stream (user_id, band_id) of all subscriptions in chunks."""
+        stmt = (
+            select(User.id, Subscription.band_id)
+            .join(User, User.email == Subscription.user_email)
+            .execution_options(yield_per=chunk_size)
+        )
+        try:
+            result = await session.stream(stmt)
+            async for chunk in result.partitions():
+                yield chunk
+        except SQLAlchemyError as e:
+            logger.error(e)
+            raise CustomBaseError("Failed to get subscriptions", 500) from e
+
+    async def claim_outbox_batch(
+        self,
+        session: AsyncSession,
+        outbox: type[NotificationOutbox] | type[EmailRetry],
+        limit: int,
+        max_attempts: int,
+        lease: float,
+        min_age: float = 0,
+    ) -> list[NotificationOutbox | EmailRetry]:
+        """Claim a batch of pending outbox rows for `lease` seconds.
+
+        Rows locked by other dispatchers are skipped, so several of them can
+        drain the outbox in parallel. The claim is committed right away, no
+        transaction stays open while sending. Claims of a dispatcher that
+        died expire with their lease. Rows younger than `min_age` seconds
+        are left for a later claim.
+        """
+        pending = (
+            select(outbox.id)
+            .where(
+                outbox.status == OutboxStatus.pending,
+                outbox.attempts < max_attempts,
+                or_(outbox.claimed_until.is_(None), outbox.claimed_until < func.now()),
+                outbox.created_at <= func.now() - timedelta(seconds=min_age),
+            )
+            .order_by(outbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(outbox)
+            .where(outbox.id.in_(pending.scalar_subquery()))
+            .values(
+                attempts=outbox.attempts + 1,
+                claimed_until=func.now() + timedelta(seconds=lease),
+            )
+            .returning(outbox)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.execute(stmt)
+            rows = sorted(result.scalars(), key=lambda row: row.id)
+            await session.commit()
+            return rows
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to claim outbox rows", 500) from e
+
+    async def renew_outbox_claims(
+        self,
+        session: AsyncSession,
+        outbox: type[NotificationOutbox] | type[EmailRetry],
+        ids: list[int],
+        lease: float,
+    ) -> None:
+        """Extend claims of rows that are still being sent by `lease` seconds."""
+        stmt = (
+            update(outbox)
+            .where(
+                outbox.id == any_(self._ids_param(ids)),
+                outbox.status == OutboxStatus.pending,
+                outbox.claimed_until.is_not(None),
+            )
+            .values(claimed_until=func.now() + timedelta(seconds=lease))
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            await session.execute(stmt)
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to renew outbox claims", 500) from e
+
+    async def complete_outbox_batch(
+        self,
+        session: AsyncSession,
+        outbox: type[NotificationOutbox] | type[EmailRetry],
+        sent_ids: list[int],
+        failed_ids: list[int],
+        max_attempts: int,
+        failed_emails: list[EmailMessage] | None = None,
+    ) -> int:
+        """Remove sent outbox rows and release failed ones for a retry.
+
+        Failed rows out of attempts are moved to the dead status. Emails the
+        provider didn't accept are written for a retry in the same
+        transaction. Returns the number of dead rows.
+        """
+        try:
+            if sent_ids:
+                await session.execute(
+                    delete(outbox).where(outbox.id == any_(self._ids_param(sent_ids)))
+                )
+            dead = 0
+            if failed_ids:
+                result = await session.execute(
+                    update(outbox)
+                    .where(outbox.id == any_(self._ids_param(failed_ids)))
+                    .values(
+                        claimed_until=None,
+                        status=case(
+                            (outbox.attempts >= max_attempts, OutboxStatus.dead),
+                            else_=OutboxStatus.pending,
+                        ),
+                    )
+                    .returning(outbox.status)
+                    .execution_options(synchronize_session=False)
+                )
+                dead = list(result.scalars()).count(OutboxStatus.dead)
+            if failed_emails:
+                await session.execute(
+                    insert(EmailRetry),
+                    [
+                        {
+                            "recipient": email.to,
+                            "subject": email.subject,
+                            "body": email.body,
+                        }
+                        for email in failed_emails
+                    ],
+                )
+            await session.commit()
+            return dead
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to complete outbox rows", 500) from e
+
+    async def expire_outbox_claims(
+        self,
+        session: AsyncSession,
+        outbox: type[NotificationOutbox] | type[EmailRetry],
+        max_attempts: int,
+    ) -> int:
+        """Move rows out of attempts whose last claim expired to dead.
+
+        Those were claimed by dispatchers that died while sending them.
+        Returns the number of dead rows.
+        """
+        stmt = (
+            update(outbox)
+            .where(
+                outbox.status == OutboxStatus.pending,
+                outbox.attempts >= max_attempts,
+                outbox.claimed_until < func.now(),
+            )
+            .values(status=OutboxStatus.dead, claimed_until=None)
+            .returning(outbox.id)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.execute(stmt)
+            await session.commit()
+            return len(result.all())
+        except SQLAlchemyError as e:
+            logger.error(e)
+            await session.rollback()
+            raise CustomBaseError("Failed to expire outbox rows", 500) from e
+
+    @classmethod
+    def _ids_param(cls, ids: list[int]) -> BindParameter:
+        return bindparam("ids", ids, type_=ARRAY(Integer))
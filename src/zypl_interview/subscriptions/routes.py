@@ -2,13 +2,28 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.zypl_interview.auth.jwt import Credentials, JWTBearer
-from src.zypl_interview.database import get_db_session
+from src.zypl_interview.config import config
+from src.zypl_interview.database import (
+    get_db_read_context_session,
+    get_db_read_session,
+    get_db_session,
+)
+from src.zypl_interview.subscriptions.events import event_hub
 from src.zypl_interview.subscriptions.injectors import get_subs_service
-from src.zypl_interview.subscriptions.schemas import SubscriptionIn
+from src.zypl_interview.subscriptions.notifier import notifier
+from src.zypl_interview.subscriptions.schemas import (
+    EventHubMetrics,
+    NotifierMetrics,
+    SubscriptionBatchIn,
+    SubscriptionBatchOut,
+    SubscriptionIn,
+    SubscriptionsOut,
+)
 from src.zypl_interview.subscriptions.service import SubscriptionService
 
 router = APIRouter(prefix="/subscriptions")
@@ -26,5 +41,95 @@ async def subscribe(
     """Subscribes a user to new album releases of the band."""
 
     return await subscription_service.subscribe_to_band(
-        session, credentials.user.email, album
+        session, credentials.user, album
+    )
+
+
+@router.post("/subscribe/batch", response_model=SubscriptionBatchOut)
+async def subscribe_batch(
+    bands: SubscriptionBatchIn,
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    subscription_service: Annotated[SubscriptionService, Depends(get_subs_service)],
+) -> SubscriptionBatchOut:
+    """Subscribes a user to a batch of bands.
+
+    Returns subscribed band ids and ids that were skipped, because the user
+    already follows them or they don't exist.
+    """
+    return await subscription_service.subscribe_to_bands(
+        session, credentials.user, bands
     )
+
+
+@router.delete("/subscribe/batch", response_model=SubscriptionBatchOut)
+async def unsubscribe_batch(
+    bands: SubscriptionBatchIn,
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    subscription_service: Annotated[SubscriptionService, Depends(get_subs_service)],
+) -> SubscriptionBatchOut:
+    """Unsubscribes a user from a batch of bands.
+
+    Returns unsubscribed band ids and ids the user didn't follow.
+    """
+    return await subscription_service.unsubscribe_from_bands(
+        session, credentials.user, bands
+    )
+
+
+@router.get("/", response_model=SubscriptionsOut)
+async def get_my_subscriptions(
+    session: Annotated[AsyncSession, Depends(get_db_read_session)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    subscription_service: Annotated[SubscriptionService, Depends(get_subs_service)],
+    limit: Annotated[
+        int, Query(ge=1, le=config.SUBSCRIPTIONS_MAX_PAGE_SIZE)
+    ] = config.SUBSCRIPTIONS_PAGE_SIZE,
+    cursor: str | None = None,
+) -> SubscriptionsOut:
+    """Get a page of bands the user follows.
+
+    Pass `next_cursor` of the previous page as `cursor` to get the next one.
+    """
+    return await subscription_service.get_user_subscriptions(
+        session, credentials.user, limit=limit, cursor=cursor
+    )
+
+
+@router.get("/events")
+async def stream_release_events(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    subscription_service: Annotated[SubscriptionService, Depends(get_subs_service)],
+) -> StreamingResponse:
+    """Stream new albums of the followed bands as server-sent events.
+
+    Bands followed after connecting are picked up on reconnect.
+    """
+    # Don't hold a db connection for the lifetime of the stream.
+    async with get_db_read_context_session() as session:
+        band_ids = await subscription_service.get_followed_band_ids(
+            session, credentials.user
+        )
+
+    return StreamingResponse(
+        subscription_service.stream_release_events(band_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/events/metrics", response_model=EventHubMetrics)
+async def get_event_metrics(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> EventHubMetrics:
+    """Returns listener and event counters of real-time events."""
+    return event_hub.metrics()
+
+
+@router.get("/notifications/metrics", response_model=NotifierMetrics)
+async def get_notification_metrics(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> NotifierMetrics:
+    """Returns queue depth and latency of release notifications."""
+    return notifier.metrics()
@@ -1,9 +1,74 @@
 """This module contains the schemas for the subscriptions module."""
 
+from enum import StrEnum
+
 from pydantic import BaseModel
 
 
+class OutboxStatus(StrEnum):
+    pending = "pending"
+    dead = "dead"
+    """Out of attempts, left in the outbox for inspection."""
+
+
 class SubscriptionIn(BaseModel):
     """Represents a subscription model."""
 
     band_id: int
+
+
+class SubscriptionBatchIn(BaseModel):
+    """Represents a batch of bands to subscribe to or unsubscribe from."""
+
+    band_ids: list[int]
+
+
+class SubscriptionBatchOut(BaseModel):
+    affected: list[int]
+    """Band ids subscribed to or unsubscribed from by the request."""
+    skipped: list[int]
+    """Band ids already in the requested state or not existing."""
+
+
+class SubscriptionOut(BaseModel):
+    band_id: int
+
+
+class SubscriptionsOut(BaseModel):
+    data: list[SubscriptionOut]
+    next_cursor: str | None = None
+
+
+class NotifierMetrics(BaseModel):
+    """Represents counters of the notification queue."""
+
+    queue_depth: int = 0
+    jobs_enqueued: int = 0
+    jobs_done: int = 0
+    jobs_failed: int = 0
+    emails_sent: int = 0
+    emails_failed: int = 0
+    """Emails the provider didn't accept, left for a retry."""
+    latency_avg: float = 0
+    """Seconds from enqueueing a job to its last email sent."""
+    latency_max: float = 0
+
+
+class ReleaseEventOut(BaseModel):
+    """Represents a real-time event about a new album."""
+
+    band_id: int
+    album_id: int
+    name: str
+
+
+class EventHubMetrics(BaseModel):
+    """Represents counters of the real-time event hub."""
+
+    listeners: int
+    bands: int
+    """Bands with at least one listener."""
+    events_published: int
+    events_delivered: int
+    events_dropped: int
+    """Events not delivered because the queue of a listener was full."""
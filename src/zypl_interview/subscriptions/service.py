@@ -1,12 +1,35 @@
 """This module contains the business logic, service layer for the subscriptions module."""
 
+import asyncio
+import heapq
 import logging
+from array import array
+from collections.abc import AsyncIterator
+from itertools import groupby, islice, repeat
+from operator import itemgetter
 
+from fastapi import HTTPException
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.zypl_interview.integration.email import EmailIntegration
+from src.zypl_interview.config import config
+from src.zypl_interview.integration.email import (
+    EmailIntegration,
+    EmailMessage,
+    SendResult,
+)
+from src.zypl_interview.pagination import decode_cursor, encode_cursor
+from src.zypl_interview.subscriptions.events import EventHub
+from src.zypl_interview.subscriptions.index import SubscriberIndex
 from src.zypl_interview.subscriptions.repository import SubscriptionRepository
-from src.zypl_interview.subscriptions.schemas import SubscriptionIn
+from src.zypl_interview.subscriptions.schemas import (
+    SubscriptionBatchIn,
+    SubscriptionBatchOut,
+    SubscriptionIn,
+    SubscriptionOut,
+    SubscriptionsOut,
+)
+from src.zypl_interview.users.schemas import UserOut
 
 logger = logging.getLogger(__name__)
 
@@ -18,41 +41,221 @@ class SubscriptionService:
         self,
         subscription_repo: SubscriptionRepository,
         email_integration: EmailIntegration,
+        subscriber_index: SubscriberIndex,
+        event_hub: EventHub,
     ) -> None:
         self.subscription_repo = subscription_repo
         self.email_integration = email_integration
+        self.subscriber_index = subscriber_index
+        self.event_hub = event_hub
 
     async def subscribe_to_band(
-        self, session: AsyncSession, user_email: int, album: SubscriptionIn
+        self, session: AsyncSession, user: UserOut, album: SubscriptionIn
     ) -> dict[str, str]:
         """Subscribes a user to new album releases of the band."""
         logger.debug("Subscribing user to band")
 
-        result = await self.subscription_repo.insert_subscription(
-            session, user_email, album.band_id
+        await self.subscription_repo.insert_subscription(
+            session, user.email, album.band_id
         )
+        self.subscriber_index.add(user.id, album.band_id)
 
         return {
-            "message": f"User subscribed to band {result.band_id}",
+            "message": f"User subscribed to band {album.band_id}",
         }
 
-    async def check_subscriptions(
-        self, session: AsyncSession, band_id: int, album_id: int
-    ) -> None:
-        """Check a user's subscriptions."""
-        logger.debug("Checking user subscriptions")
+    async def subscribe_to_bands(
+        self, session: AsyncSession, user: UserOut, bands: SubscriptionBatchIn
+    ) -> SubscriptionBatchOut:
+        """Subscribes a user to a batch of bands in one statement."""
+        band_ids = self._unique_band_ids(bands)
+        subscribed = await self.subscription_repo.insert_subscriptions(
+            session, user.email, band_ids
+        )
+        for band_id in subscribed:
+            self.subscriber_index.add(user.id, band_id)
+
+        logger.debug("Subscribed user to %s bands", len(subscribed))
+
+        return SubscriptionBatchOut(
+            affected=sorted(subscribed),
+            skipped=sorted(set(band_ids) - set(subscribed)),
+        )
+
+    async def unsubscribe_from_bands(
+        self, session: AsyncSession, user: UserOut, bands: SubscriptionBatchIn
+    ) -> SubscriptionBatchOut:
+        """Unsubscribes a user from a batch of bands in one statement."""
+        band_ids = self._unique_band_ids(bands)
+        unsubscribed = await self.subscription_repo.delete_subscriptions(
+            session, user.email, band_ids
+        )
+        for band_id in unsubscribed:
+            self.subscriber_index.remove(user.id, band_id)
+
+        logger.debug("Unsubscribed user from %s bands", len(unsubscribed))
+
+        return SubscriptionBatchOut(
+            affected=sorted(unsubscribed),
+            skipped=sorted(set(band_ids) - set(unsubscribed)),
+        )
+
+    async def get_user_subscriptions(
+        self,
+        session: AsyncSession,
+        user: UserOut,
+        limit: int = config.SUBSCRIPTIONS_PAGE_SIZE,
+        cursor: str | None = None,
+    ) -> SubscriptionsOut:
+        """Get a page of bands the user follows."""
+        limit = min(limit, config.SUBSCRIPTIONS_MAX_PAGE_SIZE)
+        band_ids = await self.subscription_repo.get_user_subscriptions(
+            session, user.email, limit + 1, after_band_id=decode_cursor(cursor)
+        )
+
+        next_cursor = None
+        if len(band_ids) > limit:
+            band_ids = band_ids[:limit]
+            next_cursor = encode_cursor(band_ids[-1])
+
+        return SubscriptionsOut(
+            data=[SubscriptionOut(band_id=band_id) for band_id in band_ids],
+            next_cursor=next_cursor,
+        )
 
-        subscriptions = await self.subscription_repo.get_subscriptions_by_band_id(
-            session, band_id
+    async def get_followed_band_ids(
+        self, session: AsyncSession, user: UserOut
+    ) -> list[int]:
+        """Get ids of all bands the user follows."""
+        if self.subscriber_index.loaded:
+            return list(self.subscriber_index.bands(user.id))
+        return await self.subscription_repo.get_band_ids_by_user_email(
+            session, user.email
         )
 
-        for sub in subscriptions:
-            logger.debug(
-                f"User {sub.user_email} is being notified about new album {album_id} from {sub.band_id}"
+    async def stream_release_events(self, band_ids: list[int]) -> AsyncIterator[bytes]:
+        """Stream new albums of the given bands as server-sent events.
+
+        Sends a comment every `EVENTS_PING_INTERVAL` seconds to keep idle
+        connections open. Runs until the client disconnects.
+        """
+        listener = self.event_hub.connect(band_ids)
+        try:
+            while True:
+                try:
+                    payload = await asyncio.wait_for(
+                        listener.get(), config.EVENTS_PING_INTERVAL
+                    )
+                except TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield b"event: album\ndata: " + payload + b"\n\n"
+        finally:
+            self.event_hub.disconnect(listener)
+
+    async def notify_new_releases(
+        self,
+        session: AsyncSession,
+        albums_by_band: dict[int, list[int]],
+    ) -> SendResult:
+        """Notify subscribers about new albums with one digest email per user.
+
+        A digest lists new albums of every given band the user follows.
+        Subscribers are streamed in chunks, so memory stays bounded. They
+        come from the subscriber index if it is loaded.
+        Returns number of emails sent and emails the provider didn't accept.
+        """
+        logger.debug("Checking user subscriptions")
+
+        if self.subscriber_index.loaded:
+            subscribers = self._iter_indexed_subscribers(session, list(albums_by_band))
+        else:
+            subscribers = self._group_by_email(
+                self.subscription_repo.iter_subscribers(
+                    session, list(albums_by_band), config.SUBSCRIBERS_CHUNK_SIZE
+                )
             )
 
-            await self.email_integration.send_email(
-                sub.user_email,
-                f"New album {album_id} from {sub.band_id}",
-                f"New album {album_id} from {sub.band_id}",
+        result = SendResult()
+        messages = []
+        async for email, band_ids in subscribers:
+            messages.append(self._digest(email, band_ids, albums_by_band))
+            if len(messages) >= config.SUBSCRIBERS_CHUNK_SIZE:
+                self._add_result(
+                    result, await self.email_integration.send_emails(messages)
+                )
+                messages = []
+        if messages:
+            self._add_result(result, await self.email_integration.send_emails(messages))
+
+        logger.debug(f"{result.sent} users were notified about new albums")
+        return result
+
+    async def _iter_indexed_subscribers(
+        self, session: AsyncSession, band_ids: list[int]
+    ) -> AsyncIterator[tuple[str, list[int]]]:
+        """Group subscribers of the bands by user, taken from the index.
+
+        Sorted subscriber arrays of the bands are merged, so every user comes
+        once with all of their bands. Only emails are read from the database.
+        """
+        # Copied, the index may change while emails are fetched.
+        pairs = heapq.merge(
+            *(
+                zip(
+                    array("q", self.subscriber_index.subscribers(band_id)),
+                    repeat(band_id),
+                )
+                for band_id in band_ids
+            )
+        )
+        users = groupby(pairs, key=itemgetter(0))
+        while chunk := [
+            (user_id, [band_id for _, band_id in rows])
+            for user_id, rows in islice(users, config.SUBSCRIBERS_CHUNK_SIZE)
+        ]:
+            emails = await self.subscription_repo.get_user_emails(
+                session, [user_id for user_id, _ in chunk]
             )
+            for user_id, user_band_ids in chunk:
+                if user_id in emails:
+                    yield emails[user_id], user_band_ids
+
+    @classmethod
+    def _add_result(cls, total: SendResult, result: SendResult) -> None:
+        total.sent += result.sent
+        total.failed.extend(result.failed)
+
+    @classmethod
+    def _unique_band_ids(cls, bands: SubscriptionBatchIn) -> list[int]:
+        if len(bands.band_ids) > config.SUBSCRIPTIONS_MAX_BATCH_SIZE:
+            raise HTTPException(status_code=422, detail="Batch is too large")
+        return list(dict.fromkeys(bands.band_ids))
+
+    @classmethod
+    async def _group_by_email(
+        cls, chunks: AsyncIterator[list[Row]]
+    ) -> AsyncIterator[tuple[str, list[int]]]:
+        """Group (user_email, band_id) rows ordered by email into band lists."""
+        current_email = None
+        band_ids = []
+        async for chunk in chunks:
+            for email, band_id in chunk:
+                if email != current_email:
+                    if band_ids:
+                        yield current_email, band_ids
+                    current_email, band_ids = email, []
+                band_ids.append(band_id)
+        if band_ids:
+            yield current_email, band_ids
+
+    @classmethod
+    def _digest(
+        cls, email: str, band_ids: list[int], albums_by_band: dict[int, list[int]]
+    ) -> EmailMessage:
+        lines = [
+            f"New albums {', '.join(map(str, albums_by_band[band_id]))} from {band_id}"
+            for band_id in band_ids
+        ]
+        subject = lines[0] if len(lines) == 1 else f"New albums from {len(lines)} bands"
+        return EmailMessage(email, subject, "\n".join(lines))
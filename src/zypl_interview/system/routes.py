@@ -0,0 +1,29 @@
+"""This module contains the routes for the system module."""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from src.zypl_interview.auth.jwt import Credentials, JWTBearer
+from src.zypl_interview.database import PoolStats, engine, replica_engines
+
+router = APIRouter(prefix="/system")
+
+
+@router.get("/db/pool", response_model=PoolStats)
+async def get_pool_stats(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> PoolStats:
+    """Returns checked out connections, overflow and checkout wait times."""
+    return engine.pool.stats()
+
+
+@router.get("/db/replicas/pool", response_model=dict[str, PoolStats])
+async def get_replica_pool_stats(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> dict[str, PoolStats]:
+    """Returns pool counters of every read replica, keyed by host."""
+    return {
+        f"{replica.url.host}:{replica.url.port}": replica.pool.stats()
+        for replica in replica_engines
+    }
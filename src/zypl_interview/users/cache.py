@@ -0,0 +1,7 @@
+"""This module contains the cache of authenticated users."""
+
+from src.zypl_interview.cache import LRUCache
+from src.zypl_interview.config import config
+
+user_cache = LRUCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+"""`UserOut` by user id."""
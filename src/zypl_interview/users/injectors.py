@@ -1,3 +1,5 @@
+from src.zypl_interview.auth.hashing import password_hasher
+from src.zypl_interview.users.cache import user_cache
 from src.zypl_interview.users.repository import UserRepository
 from src.zypl_interview.users.service import UserService
 
@@ -7,4 +9,6 @@ async def get_user_service() -> UserService:
     user_repository = UserRepository()
     return UserService(
         user_repository=user_repository,
+        user_cache=user_cache,
+        password_hasher=password_hasher,
     )
@@ -5,8 +5,16 @@ from typing import Annotated
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.zypl_interview.auth.jwt import Credentials, JWTAuth, JWTBearer
-from src.zypl_interview.auth.schemas import TokenOut
+from src.zypl_interview.auth.hashing import password_hasher
+from src.zypl_interview.auth.injectors import get_auth_service
+from src.zypl_interview.auth.jwt import Credentials, JWTBearer
+from src.zypl_interview.auth.schemas import (
+    HasherMetrics,
+    LogoutIn,
+    RefreshTokenIn,
+    TokenOut,
+)
+from src.zypl_interview.auth.service import AuthService
 from src.zypl_interview.database import get_db_session
 from src.zypl_interview.users.injectors import get_user_service
 from src.zypl_interview.users.schemas import UserInAuth, UserInRegistration, UserOut
@@ -24,7 +32,7 @@ async def register(
     session: Annotated[AsyncSession, Depends(get_db_session)],
     user: UserInRegistration,
     user_service: Annotated[UserService, Depends(get_user_service)],
-    jwt_auth: Annotated[JWTAuth, Depends(JWTAuth)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
 ) -> TokenOut:
     """Register a new user.
 
@@ -36,11 +44,7 @@ async def register(
     )
     user = await user_service.get_user_by_id(session, user_id)
 
-    access_token = jwt_auth.generate_access_token(user)
-
-    return TokenOut(
-        access_token=access_token,
-    )
+    return auth_service.issue_tokens(user)
 
 
 @router.post(
@@ -52,7 +56,7 @@ async def login(
     session: Annotated[AsyncSession, Depends(get_db_session)],
     user: UserInAuth,
     user_service: Annotated[UserService, Depends(get_user_service)],
-    jwt_auth: Annotated[JWTAuth, Depends(JWTAuth)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
 ) -> TokenOut:
     """Register a new user.
 
@@ -60,11 +64,45 @@ async def login(
     """
 
     user = await user_service.check_user(session, user)
-    access_token = jwt_auth.generate_access_token(user)
 
-    return TokenOut(
-        access_token=access_token,
-    )
+    return auth_service.issue_tokens(user)
+
+
+@router.post(
+    "/token/refresh/",
+    tags=["users"],
+    response_model=TokenOut,
+)
+async def refresh_token(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    token: RefreshTokenIn,
+    user_service: Annotated[UserService, Depends(get_user_service)],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+) -> TokenOut:
+    """Exchange a refresh token for a new pair of tokens.
+
+    The refresh token can be used only once.
+    """
+    return await auth_service.refresh_tokens(session, token.refresh_token, user_service)
+
+
+@router.post(
+    "/logout/",
+    tags=["users"],
+)
+async def logout(
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+    logout_in: LogoutIn | None = None,
+) -> dict[str, str]:
+    """Revoke the access token, and the refresh token if given."""
+    tokens = [credentials.token]
+    if logout_in is not None and logout_in.refresh_token is not None:
+        tokens.append(auth_service.decode_refresh_token(logout_in.refresh_token))
+    await auth_service.revoke_tokens(session, *tokens)
+
+    return {"message": "Logged out"}
 
 
 @router.get(
@@ -73,14 +111,9 @@ async def login(
     response_model=UserOut,
 )
 async def get_me(
-    session: Annotated[AsyncSession, Depends(get_db_session)],
     credentials: Annotated[Credentials, Depends(JWTBearer())],
-    user_service: Annotated[UserService, Depends(get_user_service)],
 ) -> UserOut:
-    return await user_service.get_user_by_id(
-        session,
-        credentials.user.id,
-    )
+    return credentials.user
 
 
 @router.patch(
@@ -94,9 +127,25 @@ async def change_username(
     credentials: Annotated[Credentials, Depends(JWTBearer())],
     user_service: Annotated[UserService, Depends(get_user_service)],
 ) -> UserOut:
-    """Change user's username."""
+    """Change user's username.
+
+    With `AUTH_STATELESS` the current access token keeps the old username,
+    refresh tokens to get one with the new username.
+    """
     return await user_service.change_username(
         session,
         user_id=credentials.user.id,
         new_username=username,
     )
+
+
+@router.get(
+    "/password_hasher/metrics",
+    tags=["users"],
+    response_model=HasherMetrics,
+)
+async def get_password_hasher_metrics(
+    credentials: Annotated[Credentials, Depends(JWTBearer())],
+) -> HasherMetrics:
+    """Returns queue depth and latency of password hashing."""
+    return password_hasher.metrics()
@@ -1,6 +1,4 @@
-from pydantic import BaseModel, field_validator
-
-from src.zypl_interview.auth.utils import hash_password
+from pydantic import BaseModel
 
 
 class UserInAuth(BaseModel):
@@ -17,11 +15,6 @@ class UserInRegistration(BaseModel):
     password: str
     email: str
 
-    @field_validator("password")
-    @classmethod
-    def hash_password(cls, value):
-        return hash_password(value)
-
 
 class UserOut(BaseModel):
     id: int
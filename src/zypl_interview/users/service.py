@@ -4,7 +4,8 @@ import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.zypl_interview.auth.utils import verify_password
+from src.zypl_interview.auth.hashing import PasswordHasher
+from src.zypl_interview.cache import CacheBackend
 from src.zypl_interview.exceptions import CustomBaseError
 from src.zypl_interview.users.repository import UserRepository
 from src.zypl_interview.users.schemas import UserInAuth, UserInRegistration, UserOut
@@ -16,14 +17,19 @@ class UserService:
     def __init__(
         self,
         user_repository: UserRepository,
+        user_cache: CacheBackend,
+        password_hasher: PasswordHasher,
     ) -> None:
         self.user_repository = user_repository
+        self.user_cache = user_cache
+        self.password_hasher = password_hasher
 
     async def add_user(self, session: AsyncSession, user_in: UserInRegistration) -> int:
         logger.debug("Adding new user")
 
+        hashed_password = await self.password_hasher.hash(user_in.password)
         return await self.user_repository.add_user(
-            session, user_in.password, user_in.username, user_in.email
+            session, hashed_password, user_in.username, user_in.email
         )
 
     async def get_user_by_id(
@@ -31,15 +37,23 @@ class UserService:
         session: AsyncSession,
         user_id: int,
     ) -> UserOut:
+        if (cached := self.get_cached_user(user_id)) is not None:
+            return cached
+
         user = await self.user_repository.get_user_by_id(session, user_id)
 
         logger.debug("Getting user by id")
 
-        return UserOut(
+        result = UserOut(
             id=user.id,
             username=user.username,
             email=user.email,
         )
+        self.user_cache.set(user_id, result)
+        return result
+
+    def get_cached_user(self, user_id: int) -> UserOut | None:
+        return self.user_cache.get(user_id)
 
     async def change_username(
         self,
@@ -49,6 +63,7 @@ class UserService:
     ) -> UserOut:
         logger.debug("Changing username")
         user = await self.user_repository.change_name(session, user_id, new_username)
+        self.user_cache.delete(user_id)
 
         return UserOut(id=user.id, username=user.username, email=user.email)
 
@@ -64,7 +79,7 @@ class UserService:
         if not user:
             raise CustomBaseError("Invalid credentials", status_code=401)
 
-        if not verify_password(user_in.password, user.password):
+        if not await self.password_hasher.verify(user_in.password, user.password):
             raise CustomBaseError("Invalid credentials", status_code=401)
 
         return UserOut(
@@ -0,0 +1,55 @@
+import io
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from src.zypl_interview.music.models import Album, Band
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import IngestMode
+from src.zypl_interview.music.versions import music_versions
+from tests.test_music_batch import make_service
+
+ROWS = 10000
+
+PER_ROW_SAMPLE = 1000
+"""Rows written one by one, the per-row path is too slow for all of them."""
+
+MIN_SPEEDUP = 50
+"""Throughput of the streaming ingest over per-row inserts it was added for."""
+
+
+def songs_csv(album_id: int, prefix: str) -> io.BytesIO:
+    rows = "".join(f"{album_id},{prefix} song {i}\n" for i in range(ROWS))
+    return io.BytesIO(f"album_id,name\n{rows}".encode())
+
+
+@pytest.mark.benchmark
+def test_csv_ingest_throughput(run_with_db) -> None:
+    async def test(session) -> tuple[float, float]:
+        band_id = await session.scalar(
+            insert(Band).values(name="Band").returning(Band.id)
+        )
+        album_id = await session.scalar(
+            insert(Album).values(name="Album", band_id=band_id).returning(Album.id)
+        )
+        await session.commit()
+        repository = MusicRepository(versions=music_versions)
+        service = make_service(repository)
+
+        started_at = time.perf_counter()
+        for i in range(PER_ROW_SAMPLE):
+            await repository.add_song(session, f"single song {i}", album_id)
+        per_row = PER_ROW_SAMPLE / (time.perf_counter() - started_at)
+
+        started_at = time.perf_counter()
+        summary = await service.ingest_songs_csv(
+            session, songs_csv(album_id, "csv"), IngestMode.skip
+        )
+        streamed = ROWS / (time.perf_counter() - started_at)
+        assert summary.inserted == ROWS
+        return per_row, streamed
+
+    per_row, streamed = run_with_db(test)
+    print(f"\nper row: {per_row:.0f} rows/s, csv ingest: {streamed:.0f} rows/s")
+    assert streamed / per_row >= MIN_SPEEDUP
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+from src.zypl_interview.integration.stub_server import StubEmailProvider
+from tests.test_email import make_integration, messages, serve
+
+EMAILS = 20000
+BATCH_SIZE = 500
+PROVIDER_LATENCY = 0.05
+"""Seconds the stub takes to answer a batch, like a remote provider."""
+
+MIN_SPEEDUP = 3
+"""Throughput of the pooled connections over a single one."""
+
+
+async def throughput(max_connections: int) -> tuple[float, StubEmailProvider]:
+    provider = StubEmailProvider(latency=PROVIDER_LATENCY)
+    async with serve(provider) as api_url:
+        integration = make_integration(
+            api_url, batch_size=BATCH_SIZE, max_connections=max_connections
+        )
+        try:
+            started_at = time.perf_counter()
+            result = await integration.send_emails(messages(EMAILS))
+            elapsed = time.perf_counter() - started_at
+        finally:
+            await integration.close()
+    assert result.sent == EMAILS
+    return EMAILS / elapsed, provider
+
+
+@pytest.mark.benchmark
+def test_pooled_email_throughput() -> None:
+    single, _ = asyncio.run(throughput(max_connections=1))
+    pooled, provider = asyncio.run(throughput(max_connections=20))
+
+    print(f"\n1 connection: {single:.0f} emails/s, 20: {pooled:.0f} emails/s")
+    assert provider.max_in_flight == 20
+    assert pooled / single >= MIN_SPEEDUP
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+
+import pytest
+
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.subscriptions.events import (
+    RELEASES_CHANNEL,
+    EventHub,
+    encode_release_event,
+    event_hub,
+)
+
+LISTENERS = 10000
+"""Listeners reading their events, spread over both hubs."""
+STALLED_LISTENERS = 100
+"""Listeners that never read, they follow every band."""
+BANDS = 100
+BANDS_PER_LISTENER = 3
+EVENTS = 500
+EVENTS_PER_SEND = 50
+SEND_INTERVAL = 0.05
+"""Seconds between transactions sending events."""
+QUEUE_SIZE = 100
+
+MAX_P99_LATENCY = 1
+"""Seconds from NOTIFY to a listener's read, for 99% of the deliveries."""
+
+Send = Callable[[list[tuple[int, int, str]]], Awaitable[None]]
+
+
+async def run_load(hubs: list[EventHub], send: Send) -> list[float]:
+    """Publish events through one source and read them on every listener.
+
+    Returns latencies of all deliveries.
+    """
+    rng = random.Random(0)
+    # Keyed by payload, hubs send the bytes of `encode_release_event`.
+    sent_at: dict[bytes, float] = {}
+    latencies: list[float] = []
+    album_bands = [album_id % BANDS for album_id in range(EVENTS)]
+
+    async def read(listener, expected: int) -> None:
+        for _ in range(expected):
+            payload = await listener.get()
+            latencies.append(time.perf_counter() - sent_at[payload])
+
+    readers = []
+    for i in range(LISTENERS):
+        band_ids = set(rng.sample(range(BANDS), BANDS_PER_LISTENER))
+        listener = hubs[i % len(hubs)].connect(band_ids)
+        expected = sum(band_id in band_ids for band_id in album_bands)
+        readers.append(asyncio.create_task(read(listener, expected)))
+    for i in range(STALLED_LISTENERS):
+        hubs[i % len(hubs)].connect(range(BANDS))
+
+    for start in range(0, EVENTS, EVENTS_PER_SEND):
+        albums = [
+            (album_bands[album_id], album_id, f"Album {album_id}")
+            for album_id in range(start, start + EVENTS_PER_SEND)
+        ]
+        now = time.perf_counter()
+        sent_at.update((encode_release_event(*album).encode(), now) for album in albums)
+        await send(albums)
+        await asyncio.sleep(SEND_INTERVAL)
+
+    await asyncio.wait_for(asyncio.gather(*readers), timeout=30)
+    return latencies
+
+
+def check_load(hubs: list[EventHub], latencies: list[float]) -> None:
+    deliveries = LISTENERS * BANDS_PER_LISTENER * EVENTS // BANDS
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    dropped = sum(hub.metrics().events_dropped for hub in hubs)
+    print(
+        f"\n{len(latencies)} deliveries, latency median "
+        f"{statistics.median(latencies) * 1000:.1f} ms, "
+        f"p99 {p99 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms, "
+        f"{dropped} dropped"
+    )
+
+    assert len(latencies) == deliveries
+    # Only the stalled listeners drop, the ones reading get everything.
+    assert dropped == STALLED_LISTENERS * (EVENTS - QUEUE_SIZE)
+    assert sum(hub.metrics().events_delivered for hub in hubs) == (
+        deliveries + STALLED_LISTENERS * QUEUE_SIZE
+    )
+    assert p99 <= MAX_P99_LATENCY
+
+
+@pytest.mark.benchmark
+def test_two_hubs_share_one_notification_source() -> None:
+    hubs = [EventHub(QUEUE_SIZE, dsn="", reconnect_interval=0) for _ in range(2)]
+
+    async def send(albums: list[tuple[int, int, str]]) -> None:
+        # Every hub's connection gets every notification of the channel.
+        for album in albums:
+            payload = encode_release_event(*album)
+            for hub in hubs:
+                hub.on_notification(None, 0, RELEASES_CHANNEL, payload)
+
+    check_load(hubs, asyncio.run(run_load(hubs, send)))
+
+
+@pytest.mark.benchmark
+def test_two_hubs_listen_to_postgres(run_with_db) -> None:
+    hubs = [
+        EventHub(QUEUE_SIZE, dsn=event_hub.dsn, reconnect_interval=1) for _ in range(2)
+    ]
+
+    async def test(session) -> list[float]:
+        async def send(albums: list[tuple[int, int, str]]) -> None:
+            await MusicRepository._notify_releases(session, albums)
+            await session.commit()
+
+        for hub in hubs:
+            await hub.start()
+        try:
+            # Give the hubs time to connect and LISTEN.
+            await asyncio.sleep(1)
+            return await run_load(hubs, send)
+        finally:
+            for hub in hubs:
+                await hub.stop()
+
+    check_load(hubs, run_with_db(test))
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from src.zypl_interview.music.models import Album, Band
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import MusicIn
+from src.zypl_interview.music.versions import music_versions
+from tests.test_music_batch import make_service
+
+ITEMS_PER_TYPE = 1000
+
+MIN_SPEEDUP = 50
+"""Throughput of the batch endpoint over per-item creates it was added for."""
+
+
+def music_items(band_id: int, album_id: int, prefix: str) -> list[MusicIn]:
+    items = []
+    for i in range(ITEMS_PER_TYPE):
+        items += [
+            {"type": "Band", "data": {"name": f"{prefix} band {i}"}},
+            {
+                "type": "Album",
+                "data": {"name": f"{prefix} album {i}", "band_id": band_id},
+            },
+            {
+                "type": "Song",
+                "data": {"name": f"{prefix} song {i}", "album_id": album_id},
+            },
+        ]
+    return [MusicIn.model_validate(item) for item in items]
+
+
+@pytest.mark.benchmark
+def test_batch_create_throughput(run_with_db) -> None:
+    async def test(session) -> tuple[float, float]:
+        band_id = await session.scalar(
+            insert(Band).values(name="Band").returning(Band.id)
+        )
+        album_id = await session.scalar(
+            insert(Album).values(name="Album", band_id=band_id).returning(Album.id)
+        )
+        await session.commit()
+        service = make_service(MusicRepository(versions=music_versions))
+
+        items = music_items(band_id, album_id, "single")
+        started_at = time.perf_counter()
+        for item in items:
+            await service.add_music(session, item)
+        single = len(items) / (time.perf_counter() - started_at)
+
+        items = music_items(band_id, album_id, "batch")
+        started_at = time.perf_counter()
+        await service.add_music_batch(session, items)
+        batch = len(items) / (time.perf_counter() - started_at)
+        return single, batch
+
+    single, batch = run_with_db(test)
+    print(f"\nper item: {single:.0f} items/s, batch: {batch:.0f} items/s")
+    assert batch / single >= MIN_SPEEDUP
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from collections import namedtuple
+from unittest import mock
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.zypl_interview.config import config
+from src.zypl_interview.music.models import Song
+from src.zypl_interview.music.schemas import MusicOut, MusicType
+from tests.test_music_batch import make_service
+
+ROWS = 10000
+
+MIN_SPEEDUP = 5
+"""Speedup of encoding column tuples over building and validating models."""
+
+SongRow = namedtuple("SongRow", "id name album_id")
+
+
+def listing_service():
+    repository = mock.Mock()
+    repository.get_music = mock.AsyncMock(
+        return_value=[Song(id=i, name=f"Song {i}", album_id=1) for i in range(ROWS)]
+    )
+    repository.get_music_rows = mock.AsyncMock(
+        return_value=[SongRow(i, f"Song {i}", 1) for i in range(ROWS)]
+    )
+    service = make_service(repository)
+    service.music_cache.get.return_value = None
+    return service
+
+
+async def model_listing(service) -> bytes:
+    result = await service.get_music(mock.MagicMock(), MusicType.song, limit=ROWS)
+    # What FastAPI does with a response_model before rendering.
+    validated = MusicOut.model_validate(result.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+async def fast_listing(service) -> bytes:
+    return await service.get_music_json(mock.MagicMock(), MusicType.song, limit=ROWS)
+
+
+def timed(listing, service) -> tuple[float, bytes]:
+    started_at = time.perf_counter()
+    content = asyncio.run(listing(service))
+    return time.perf_counter() - started_at, content
+
+
+@pytest.mark.benchmark
+def test_fast_serialization_at_10k_rows(monkeypatch) -> None:
+    monkeypatch.setattr(config, "MUSIC_MAX_PAGE_SIZE", ROWS)
+    service = listing_service()
+
+    model_time, model_content = timed(model_listing, service)
+    fast_time, fast_content = timed(fast_listing, service)
+
+    print(f"\nmodels: {model_time * 1000:.1f} ms, tuples: {fast_time * 1000:.1f} ms")
+    assert fast_content == model_content
+    assert model_time / fast_time >= MIN_SPEEDUP
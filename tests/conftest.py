@@ -0,0 +1,65 @@
+import asyncio
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+
+# Settings the app needs at import time. Tests that need a database run
+# only with TEST_DATABASE=1 and DB_* pointing at a disposable database.
+os.environ.setdefault("DB_DRIVER", "postgresql+asyncpg")
+os.environ.setdefault("DB_USERNAME", "test")
+os.environ.setdefault("DB_HOST", "localhost")
+os.environ.setdefault("DB_PORT", "5432")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_ECHO", "0")
+os.environ.setdefault("JWT_SECRET", "test-secret-of-at-least-32-bytes!")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+DbRunner = Callable[[Callable[..., Awaitable[Any]]], Any]
+
+
+@pytest.fixture
+def run_with_db() -> DbRunner:
+    """Run a test coroutine with a session of a freshly created schema."""
+    if os.environ.get("TEST_DATABASE") != "1":
+        pytest.skip("needs TEST_DATABASE=1 and a disposable database")
+
+    from sqlalchemy import insert
+
+    import src.zypl_interview.auth.models
+    import src.zypl_interview.subscriptions.models
+    import src.zypl_interview.users.models  # noqa: F401
+    from src.zypl_interview.database import Base, engine, get_db_context_session
+    from src.zypl_interview.music.models import MusicVersion
+    from src.zypl_interview.music.schemas import MusicType
+
+    def run(test: Callable[..., Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.drop_all)
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(
+                    insert(MusicVersion),
+                    [{"type": music_type, "version": 0} for music_type in MusicType],
+                )
+            try:
+                async with get_db_context_session() as session:
+                    return await test(session)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def auth_headers() -> dict[str, str]:
+    """Headers of a user authenticated from token claims only."""
+    from src.zypl_interview.auth.jwt import JWTAuth
+    from src.zypl_interview.users.schemas import UserOut
+
+    user = UserOut(id=1, username="test", email="test@example.com")
+    return {"Authorization": f"Bearer {JWTAuth().generate_access_token(user)}"}
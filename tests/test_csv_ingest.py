@@ -0,0 +1,154 @@
+import asyncio
+import io
+
+from sqlalchemy import func, insert, select
+
+from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.music.models import Album, Band, Song
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import CsvUploadOut, IngestMode
+from src.zypl_interview.music.versions import music_versions
+from tests.test_music_batch import make_service
+
+
+class FakeSongs:
+    """Songs table with the (album_id, name) unique key of the real one."""
+
+    def __init__(self, album_ids: set[int], songs: set[tuple[int, str]] = ()) -> None:
+        self.album_ids = album_ids
+        self.songs = set(songs)
+        self.add_songs_calls = 0
+
+    async def get_existing_album_ids(self, session, album_ids: list[int]) -> set[int]:
+        return self.album_ids & set(album_ids)
+
+    async def add_songs(self, session, songs: list[dict], mode: IngestMode) -> int:
+        self.add_songs_calls += 1
+        keys = [(song["album_id"], song["name"]) for song in songs]
+        if any(album_id not in self.album_ids for album_id, _ in keys):
+            raise CustomBaseError("Failed to insert songs", 409)
+        new = [key for key in keys if key not in self.songs]
+        if mode == IngestMode.insert and len(new) < len(keys):
+            raise CustomBaseError("Failed to insert songs", 409)
+        self.songs.update(new)
+        return len(new)
+
+
+def ingest(repository, content: str, mode: IngestMode, **kwargs) -> CsvUploadOut:
+    service = make_service(repository)
+    stream = io.BytesIO(content.encode())
+    return asyncio.run(service.ingest_songs_csv(None, stream, mode=mode, **kwargs))
+
+
+CSV = "album_id,name\n1,A\n1,B\n1,A\n2,C\n"
+
+
+def test_skip_mode_skips_existing_and_repeated_songs() -> None:
+    repository = FakeSongs({1, 2}, {(1, "B")})
+
+    summary = ingest(repository, CSV, IngestMode.skip)
+
+    assert (summary.inserted, summary.skipped, summary.rejected) == (2, 2, 0)
+    assert repository.songs == {(1, "A"), (1, "B"), (2, "C")}
+
+
+def test_insert_mode_rejects_repeated_songs() -> None:
+    repository = FakeSongs({1, 2})
+
+    summary = ingest(repository, CSV, IngestMode.insert)
+
+    assert (summary.inserted, summary.skipped, summary.rejected) == (3, 0, 1)
+    assert [(e.line, e.reason) for e in summary.errors] == [(4, "Duplicate song")]
+
+
+def test_insert_mode_rejects_chunk_with_existing_song() -> None:
+    repository = FakeSongs({1, 2}, {(1, "B")})
+
+    summary = ingest(repository, CSV, IngestMode.insert)
+
+    # The chunk is retried once after checking its albums, then rejected.
+    assert repository.add_songs_calls == 2
+    assert (summary.inserted, summary.rejected) == (0, 4)
+    assert summary.errors[-1].reason == "Rejected by database"
+
+
+def test_rows_of_unknown_or_bad_albums_are_rejected() -> None:
+    repository = FakeSongs({1})
+
+    summary = ingest(
+        repository, "album_id,name\n1,A\n2,B\nx,C\n1,\n1\n", IngestMode.skip
+    )
+
+    assert (summary.inserted, summary.rejected) == (1, 4)
+    assert [e.reason for e in summary.errors] == [
+        "Album id is not a number",
+        "Song name is empty",
+        "Expected 2 columns",
+        "Album 2 doesn't exist",
+    ]
+
+
+def test_album_deleted_after_it_was_cached_is_retried_once() -> None:
+    repository = FakeSongs({1, 2})
+    service = make_service(repository)
+    service.album_ids_cache.set(1, True)
+    service.album_ids_cache.set(2, True)
+    # Another worker deletes album 2 after this one cached it.
+    repository.album_ids.discard(2)
+    stream = io.BytesIO(CSV.encode())
+
+    summary = asyncio.run(service.ingest_songs_csv(None, stream, IngestMode.skip))
+
+    assert repository.add_songs_calls == 2
+    assert (summary.inserted, summary.skipped, summary.rejected) == (2, 1, 1)
+    assert summary.errors[0].reason == "Album 2 doesn't exist"
+    assert service.album_ids_cache.get(2) is None
+
+
+def test_chunk_without_existing_albums_is_not_retried() -> None:
+    repository = FakeSongs(set())
+    service = make_service(repository)
+    service.album_ids_cache.set(1, True)
+    stream = io.BytesIO(b"album_id,name\n1,A\n")
+
+    summary = asyncio.run(service.ingest_songs_csv(None, stream, IngestMode.skip))
+
+    assert repository.add_songs_calls == 1
+    assert (summary.inserted, summary.rejected) == (0, 1)
+
+
+def test_ingest_resumes_after_rows_of_summary() -> None:
+    repository = FakeSongs({1, 2})
+    summary = CsvUploadOut(inserted=2)
+
+    summary = ingest(repository, CSV, IngestMode.skip, summary=summary)
+
+    assert repository.songs == {(1, "A"), (2, "C")}
+    assert (summary.inserted, summary.skipped) == (4, 0)
+
+
+def test_ingest_modes_against_db(run_with_db) -> None:
+    async def test(session) -> tuple[CsvUploadOut, CsvUploadOut, int]:
+        band_id = await session.scalar(
+            insert(Band).values(name="Band").returning(Band.id)
+        )
+        album_id = await session.scalar(
+            insert(Album).values(name="Album", band_id=band_id).returning(Album.id)
+        )
+        await session.commit()
+        service = make_service(MusicRepository(versions=music_versions))
+        content = f"album_id,name\n{album_id},A\n{album_id},B\n{album_id + 1},C\n"
+
+        first = await service.ingest_songs_csv(
+            session, io.BytesIO(content.encode()), IngestMode.skip
+        )
+        retried = await service.ingest_songs_csv(
+            session, io.BytesIO(content.encode()), IngestMode.insert
+        )
+        songs = await session.scalar(select(func.count()).select_from(Song))
+        return first, retried, songs
+
+    first, retried, songs = run_with_db(test)
+    assert (first.inserted, first.skipped, first.rejected) == (2, 0, 1)
+    assert (retried.inserted, retried.rejected) == (0, 3)
+    assert songs == 2
@@ -0,0 +1,83 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.zypl_interview import database
+from src.zypl_interview.config import ReplicaStrategy
+from src.zypl_interview.database import (
+    DB_URL,
+    ReadSession,
+    ReplicaRouter,
+    RoutingSession,
+    current_user_id,
+    get_db_read_context_session,
+)
+
+
+def test_writer_is_pinned_to_primary_on_commit(monkeypatch) -> None:
+    monkeypatch.setattr(database, "replica_engines", [mock.Mock()])
+    monkeypatch.setattr(database, "_primary_pins", {})
+    session = RoutingSession()
+    token = current_user_id.set(7)
+    try:
+        database._pin_writer(session)
+        assert not database._is_pinned(7)
+
+        session.info["wrote"] = True
+        database._pin_writer(session)
+    finally:
+        current_user_id.reset(token)
+
+    assert database._is_pinned(7)
+    assert not database._is_pinned(8)
+    assert "wrote" not in session.info
+    assert event.contains(RoutingSession, "after_commit", database._pin_writer)
+
+
+def failing_read_session(monkeypatch, error: Exception, replica_down: bool):
+    router = mock.Mock()
+    router.is_down.return_value = replica_down
+    monkeypatch.setattr(database, "replica_router", router)
+    query = mock.AsyncMock(side_effect=[error, "rows"])
+    monkeypatch.setattr(AsyncSession, "execute", query)
+    session = ReadSession()
+    session.sync_session.info["engine"] = mock.Mock()
+    return session, router, query
+
+
+def test_read_of_failed_replica_is_retried_on_primary(monkeypatch) -> None:
+    lost = DBAPIError("SELECT 1", {}, OSError("connection lost"), True)
+    session, router, query = failing_read_session(monkeypatch, lost, True)
+
+    assert asyncio.run(session.execute(select(1))) == "rows"
+    assert query.await_count == 2
+    assert session.sync_session.info["engine"] is router.primary
+
+
+def test_read_errors_of_healthy_replica_are_raised(monkeypatch) -> None:
+    error = DBAPIError("SELECT 1", {}, ValueError("syntax error"))
+    session, _, query = failing_read_session(monkeypatch, error, False)
+
+    with pytest.raises(DBAPIError):
+        asyncio.run(session.execute(select(1)))
+    assert query.await_count == 1
+
+
+def test_read_falls_back_when_replica_is_unreachable(run_with_db, monkeypatch):
+    # Nothing listens on port 1, connecting to the replica is refused.
+    replica = database._create_engine(DB_URL.set(host="127.0.0.1", port=1))
+    router = ReplicaRouter(
+        database.engine, [replica], ReplicaStrategy.round_robin, retry_after=60
+    )
+    monkeypatch.setattr(database, "replica_router", router)
+
+    async def test(session) -> int:
+        async with get_db_read_context_session() as read_session:
+            return await read_session.scalar(select(1))
+
+    assert run_with_db(test) == 1
+    assert router.is_down(replica)
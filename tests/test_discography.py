@@ -0,0 +1,136 @@
+import asyncio
+import json
+from collections import namedtuple
+from unittest import mock
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from src.zypl_interview.main import app_factory
+from src.zypl_interview.music import routes
+from src.zypl_interview.music.injectors import get_music_service
+from src.zypl_interview.music.models import Album, Band, Song
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import DiscographyOut
+from src.zypl_interview.music.versions import music_versions
+from tests.test_music_batch import make_service
+
+DiscographyRow = namedtuple("DiscographyRow", "id name song_id song_name")
+
+
+def fake_repository(band: Band | None, partitions: list[list[DiscographyRow]]):
+    async def stream_discography_rows(session, band_id, fetch_size):
+        for partition in partitions:
+            yield partition
+
+    repository = mock.Mock()
+    repository.get_band = mock.AsyncMock(return_value=band)
+    repository.stream_discography_rows = stream_discography_rows
+    return repository
+
+
+def read_discography(service, band_id: int) -> dict:
+    async def read() -> bytes:
+        chunks = [
+            chunk async for chunk in service.get_discography(mock.MagicMock(), band_id)
+        ]
+        return b"".join(chunks)
+
+    return json.loads(asyncio.run(read()))
+
+
+def test_discography_streams_albums_with_their_songs() -> None:
+    repository = fake_repository(
+        Band(id=1, name="Band"),
+        [
+            [
+                DiscographyRow(10, "First", 100, "A"),
+                DiscographyRow(10, "First", 101, "B"),
+            ],
+            [
+                DiscographyRow(11, "Empty", None, None),
+                DiscographyRow(12, "Last", 102, "C"),
+            ],
+        ],
+    )
+
+    discography = read_discography(make_service(repository), 1)
+
+    assert DiscographyOut.model_validate(discography)
+    assert discography == {
+        "id": 1,
+        "name": "Band",
+        "albums": [
+            {
+                "id": 10,
+                "name": "First",
+                "band_id": 1,
+                "songs": [
+                    {"id": 100, "name": "A", "album_id": 10},
+                    {"id": 101, "name": "B", "album_id": 10},
+                ],
+            },
+            {"id": 11, "name": "Empty", "band_id": 1, "songs": []},
+            {
+                "id": 12,
+                "name": "Last",
+                "band_id": 1,
+                "songs": [{"id": 102, "name": "C", "album_id": 12}],
+            },
+        ],
+    }
+
+
+def test_discography_of_band_without_albums() -> None:
+    repository = fake_repository(Band(id=1, name="Band"), [])
+
+    assert read_discography(make_service(repository), 1) == {
+        "id": 1,
+        "name": "Band",
+        "albums": [],
+    }
+
+
+def test_missing_band_fails_before_streaming() -> None:
+    service = make_service(fake_repository(None, []))
+
+    with pytest.raises(HTTPException) as error:
+        read_discography(service, 1)
+    assert error.value.status_code == 404
+
+
+def test_route_responds_404_for_missing_band(auth_headers, monkeypatch) -> None:
+    service = make_service(fake_repository(None, []))
+    service.get_etag = mock.AsyncMock(return_value='"1-1-1"')
+    monkeypatch.setattr(routes, "get_db_read_context_session", mock.MagicMock())
+    app = app_factory()
+    app.dependency_overrides[get_music_service] = lambda: service
+
+    async def get() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.get("/api/music/bands/1/discography", headers=auth_headers)
+
+    response = asyncio.run(get())
+    assert response.status_code == 404
+
+
+def test_discography_from_db(run_with_db) -> None:
+    async def test(session) -> dict:
+        band = Band(name="Band")
+        session.add(band)
+        await session.flush()
+        albums = [Album(name=f"Album {i}", band_id=band.id) for i in range(3)]
+        session.add_all(albums)
+        await session.flush()
+        session.add_all(Song(name=f"Song {i}", album_id=albums[0].id) for i in range(5))
+        session.add(Song(name="Song", album_id=albums[2].id))
+        await session.commit()
+
+        service = make_service(MusicRepository(versions=music_versions))
+        chunks = [chunk async for chunk in service.get_discography(session, band.id)]
+        return json.loads(b"".join(chunks))
+
+    discography = DiscographyOut.model_validate(run_with_db(test))
+    assert [len(album.songs) for album in discography.albums] == [5, 0, 1]
@@ -0,0 +1,146 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import pytest
+from aiohttp import web
+
+from src.zypl_interview.exceptions import CustomBaseError
+from src.zypl_interview.integration.email import EmailIntegration, EmailMessage
+from src.zypl_interview.integration.stub_server import StubEmailProvider
+
+
+@asynccontextmanager
+async def serve(provider: StubEmailProvider) -> AsyncIterator[str]:
+    runner = web.AppRunner(provider.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        host, port = runner.addresses[0][:2]
+        yield f"http://{host}:{port}"
+    finally:
+        await runner.cleanup()
+
+
+def make_integration(api_url: str, **kwargs) -> EmailIntegration:
+    settings = {
+        "api_key": "key",
+        "sender": "noreply@test",
+        "batch_size": 10,
+        "max_connections": 4,
+        "timeout": 5,
+        "max_retries": 3,
+        "retry_backoff": 0.1,
+    } | kwargs
+    return EmailIntegration(api_url=api_url, **settings)
+
+
+def messages(count: int) -> list[EmailMessage]:
+    return [EmailMessage(f"user{i}@test", "Subject", "Body") for i in range(count)]
+
+
+def send(provider: StubEmailProvider, emails: list[EmailMessage], **kwargs):
+    async def main():
+        async with serve(provider) as api_url:
+            integration = make_integration(api_url, **kwargs)
+            try:
+                return await integration.send_emails(emails)
+            finally:
+                await integration.close()
+
+    return asyncio.run(main())
+
+
+def test_connections_are_bounded_by_the_pool() -> None:
+    provider = StubEmailProvider(latency=0.05)
+
+    result = send(provider, messages(200), max_connections=4)
+
+    assert result.sent == 200
+    assert not result.failed
+    assert provider.requests == 20
+    assert provider.max_in_flight == 4
+
+
+def test_failed_recipients_are_reported() -> None:
+    provider = StubEmailProvider(
+        rejected_recipients=frozenset({"user3@test", "user7@test"})
+    )
+
+    result = send(provider, messages(10), batch_size=1)
+
+    assert result.sent == 8
+    assert [message.to for message in result.failed] == ["user3@test", "user7@test"]
+    # Rejected batches aren't retried.
+    assert provider.requests == 10
+
+
+def test_failed_batches_are_retried_with_jittered_backoff() -> None:
+    provider = StubEmailProvider(fail_first=3)
+
+    with mock.patch(
+        "src.zypl_interview.integration.email.random.uniform", return_value=0
+    ) as uniform:
+        result = send(provider, messages(1), max_retries=3, retry_backoff=0.1)
+
+    assert result.sent == 1
+    assert provider.requests == 4
+    # Each delay is drawn up to a bound doubled on every retry.
+    assert [c.args for c in uniform.call_args_list] == [(0, 0.1), (0, 0.2), (0, 0.4)]
+
+
+def test_batch_out_of_retries_is_failed() -> None:
+    provider = StubEmailProvider(fail_first=10)
+
+    with mock.patch(
+        "src.zypl_interview.integration.email.random.uniform", return_value=0
+    ):
+        result = send(provider, messages(15), max_retries=2, batch_size=10)
+
+    assert result.sent == 0
+    assert len(result.failed) == 15
+    assert provider.requests == 6
+
+
+def test_error_of_one_batch_doesnt_fail_the_others() -> None:
+    integration = make_integration("http://unused", batch_size=1)
+
+    async def send_batch(batch):
+        if batch[0].to == "user0@test":
+            raise RuntimeError("connection reset")
+
+    with mock.patch.object(integration, "_send_batch", send_batch):
+        result = asyncio.run(integration.send_emails(messages(3)))
+
+    assert result.sent == 2
+    assert [message.to for message in result.failed] == ["user0@test"]
+
+
+def test_cancelled_batch_cancels_the_send() -> None:
+    integration = make_integration("http://unused")
+
+    async def send_batch(batch):
+        raise asyncio.CancelledError
+
+    with (
+        mock.patch.object(integration, "_send_batch", send_batch),
+        pytest.raises(asyncio.CancelledError),
+    ):
+        asyncio.run(integration.send_emails(messages(3)))
+
+
+def test_single_email_failure_raises() -> None:
+    provider = StubEmailProvider(rejected_recipients=frozenset({"user@test"}))
+
+    async def main() -> None:
+        async with serve(provider) as api_url:
+            integration = make_integration(api_url)
+            try:
+                await integration.send_email("user@test", "Subject", "Body")
+            finally:
+                await integration.close()
+
+    with pytest.raises(CustomBaseError):
+        asyncio.run(main())
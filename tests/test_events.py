@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+from src.zypl_interview.subscriptions.events import (
+    RELEASES_CHANNEL,
+    EventHub,
+    encode_release_event,
+)
+from src.zypl_interview.subscriptions.schemas import ReleaseEventOut
+
+
+def make_hub(queue_size: int = 10) -> EventHub:
+    return EventHub(queue_size=queue_size, dsn="", reconnect_interval=0)
+
+
+def test_publish_fans_out_to_listeners_of_band() -> None:
+    hub = make_hub()
+    first = hub.connect([1, 2])
+    second = hub.connect([1])
+    other = hub.connect([3])
+
+    hub.publish(ReleaseEventOut(band_id=1, album_id=10, name="Album"))
+
+    async def receive() -> list[bytes]:
+        return [await first.get(), await second.get()]
+
+    payloads = asyncio.run(receive())
+    assert [json.loads(p) for p in payloads] == [
+        {"band_id": 1, "album_id": 10, "name": "Album"}
+    ] * 2
+    assert not other._events
+    metrics = hub.metrics()
+    assert metrics.events_published == 1
+    assert metrics.events_delivered == 2
+
+
+def test_full_listener_drops_events() -> None:
+    hub = make_hub(queue_size=1)
+    listener = hub.connect([1])
+
+    for album_id in range(3):
+        hub.publish(ReleaseEventOut(band_id=1, album_id=album_id, name="Album"))
+
+    assert listener.dropped == 2
+    assert hub.metrics().events_dropped == 2
+
+
+def test_disconnect_removes_listener() -> None:
+    hub = make_hub()
+    listener = hub.connect([1, 2])
+    hub.disconnect(listener)
+
+    hub.publish(ReleaseEventOut(band_id=1, album_id=10, name="Album"))
+
+    metrics = hub.metrics()
+    assert metrics.listeners == 0
+    assert metrics.bands == 0
+    assert metrics.events_delivered == 0
+
+
+def test_notifications_are_published() -> None:
+    hub = make_hub()
+    listener = hub.connect([1])
+
+    hub.on_notification(None, 0, RELEASES_CHANNEL, encode_release_event(1, 10, "A"))
+    hub.on_notification(None, 0, RELEASES_CHANNEL, "not json")
+
+    assert json.loads(listener._events[0]) == {
+        "band_id": 1,
+        "album_id": 10,
+        "name": "A",
+    }
+    assert hub.metrics().events_published == 1
+
+
+def test_too_long_events_are_not_encoded() -> None:
+    assert encode_release_event(1, 10, "a" * 8000) is None
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+from unittest import mock
+
+from src.zypl_interview.music.jobs import IngestJobManager
+from src.zypl_interview.music.schemas import (
+    CsvUploadOut,
+    IngestJobOut,
+    IngestJobStatus,
+    IngestMode,
+)
+
+
+def spool_job(manager: IngestJobManager, status: IngestJobStatus) -> IngestJobOut:
+    now = datetime.now()
+    job = IngestJobOut(
+        id="0" * 32,
+        status=status,
+        mode=IngestMode.skip,
+        created_at=now,
+        updated_at=now,
+    )
+    manager.spool_dir.mkdir(parents=True, exist_ok=True)
+    manager._csv_path(job.id).write_bytes(b"album_id,name\n1,A\n")
+    manager._write_state(job, manager._state_path(job.id))
+    return job
+
+
+def test_job_state_is_read_after_taking_the_lock(tmp_path) -> None:
+    manager = IngestJobManager(tmp_path, concurrency=1)
+    job = spool_job(manager, IngestJobStatus.queued)
+    # Progress saved by a worker that held the lock after the job was queued.
+    job.status = IngestJobStatus.running
+    job.summary = CsvUploadOut(inserted=1)
+    manager._write_state(job, manager._state_path(job.id))
+
+    with mock.patch.object(manager, "_ingest") as ingest:
+        asyncio.run(manager._run(job.id))
+
+    resumed = ingest.call_args.args[0]
+    assert resumed.status == IngestJobStatus.running
+    assert resumed.summary.inserted == 1
+
+
+def test_job_finished_by_another_worker_is_not_run_again(tmp_path) -> None:
+    manager = IngestJobManager(tmp_path, concurrency=1)
+    job = spool_job(manager, IngestJobStatus.finished)
+
+    with mock.patch.object(manager, "_ingest") as ingest:
+        asyncio.run(manager._run(job.id))
+
+    ingest.assert_not_called()
+    assert not manager._csv_path(job.id).exists()
@@ -0,0 +1,109 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from sqlalchemy import select
+
+from src.zypl_interview.cache import LRUCache
+from src.zypl_interview.database import get_db_session
+from src.zypl_interview.main import app_factory
+from src.zypl_interview.music.injectors import get_music_service
+from src.zypl_interview.music.models import Album, Band, Song
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import MusicIn
+from src.zypl_interview.music.service import MusicService
+from src.zypl_interview.music.versions import music_versions
+
+
+def make_service(repository: MusicRepository) -> MusicService:
+    return MusicService(
+        music_repository=repository,
+        outbox_dispatcher=mock.Mock(),
+        music_cache=mock.Mock(),
+        album_ids_cache=LRUCache(maxsize=100, ttl=60),
+    )
+
+
+def mixed_batch(band_id: int, album_id: int) -> list[dict]:
+    return [
+        {"type": "Song", "data": {"name": "Song 1", "album_id": album_id}},
+        {"type": "Band", "data": {"name": "Band 2"}},
+        {"type": "Album", "data": {"name": "Album 2", "band_id": band_id}},
+        {"type": "Band", "data": {"name": "Band 3"}},
+        {"type": "Song", "data": {"name": "Song 2", "album_id": album_id}},
+    ]
+
+
+def post_batch(
+    service: MusicService, headers: dict[str, str], body: list[dict]
+) -> httpx.Response:
+    app = app_factory()
+    app.dependency_overrides[get_db_session] = lambda: None
+    app.dependency_overrides[get_music_service] = lambda: service
+
+    async def post() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await c.post("/api/music/batch", json=body, headers=headers)
+
+    return asyncio.run(post())
+
+
+def test_batch_returns_ids_in_input_order(auth_headers) -> None:
+    repository = mock.Mock()
+    repository.add_music_batch = mock.AsyncMock(return_value=([20, 21], [30], [10, 11]))
+
+    response = post_batch(make_service(repository), auth_headers, mixed_batch(1, 1))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["data"] == [
+        {"type": "Song", "id": 10},
+        {"type": "Band", "id": 20},
+        {"type": "Album", "id": 30},
+        {"type": "Band", "id": 21},
+        {"type": "Song", "id": 11},
+    ]
+    _, bands, albums, songs = repository.add_music_batch.call_args.args
+    assert bands == [{"name": "Band 2"}, {"name": "Band 3"}]
+    assert albums == [{"name": "Album 2", "band_id": 1}]
+    assert songs == [
+        {"name": "Song 1", "album_id": 1},
+        {"name": "Song 2", "album_id": 1},
+    ]
+
+
+def test_batch_rejects_data_of_another_type(auth_headers) -> None:
+    repository = mock.Mock()
+    body = [{"type": "Band", "data": {"name": "Album", "band_id": 1}}]
+
+    response = post_batch(make_service(repository), auth_headers, body)
+
+    assert response.status_code == 422
+    repository.add_music_batch.assert_not_called()
+
+
+def test_batch_ids_match_rows_in_db(run_with_db) -> None:
+    async def test(session) -> None:
+        band = Band(name="Band 1")
+        session.add(band)
+        await session.flush()
+        album = Album(name="Album 1", band_id=band.id)
+        session.add(album)
+        await session.commit()
+
+        service = make_service(MusicRepository(versions=music_versions))
+        batch = mixed_batch(band.id, album.id)
+        result = await service.add_music_batch(
+            session, [MusicIn.model_validate(item) for item in batch]
+        )
+
+        models = {"Band": Band, "Album": Album, "Song": Song}
+        for item, created in zip(batch, result.data, strict=True):
+            model = models[item["type"]]
+            assert created.type == item["type"]
+            name = await session.scalar(
+                select(model.name).where(model.id == created.id)
+            )
+            assert name == item["data"]["name"]
+
+    run_with_db(test)
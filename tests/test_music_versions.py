@@ -0,0 +1,50 @@
+import asyncio
+
+import asyncpg
+
+from src.zypl_interview.music.repository import MusicRepository
+from src.zypl_interview.music.schemas import MusicType
+from src.zypl_interview.music.versions import (
+    VERSIONS_CHANNEL,
+    MusicVersions,
+    music_versions,
+)
+
+
+def test_notified_versions_are_applied() -> None:
+    versions = MusicVersions(dsn="", sync_interval=60)
+    etag = versions.etag(*MusicType)
+
+    versions.on_notification(None, 1, VERSIONS_CHANNEL, "Album:3")
+
+    assert versions.get(MusicType.album) == 3
+    assert versions.etag(*MusicType) != etag
+
+
+def test_older_and_malformed_notifications_are_ignored() -> None:
+    versions = MusicVersions(dsn="", sync_interval=60)
+    versions.update({MusicType.song: 5})
+
+    for payload in ("Song:4", "Song:x", "Track:9", ""):
+        versions.on_notification(None, 1, VERSIONS_CHANNEL, payload)
+
+    assert versions.get(MusicType.song) == 5
+
+
+def test_write_notifies_its_versions(run_with_db) -> None:
+    async def test(session) -> list[str]:
+        payloads = []
+        connection = await asyncpg.connect(music_versions.dsn)
+        try:
+            await connection.add_listener(
+                VERSIONS_CHANNEL, lambda *args: payloads.append(args[-1])
+            )
+            repository = MusicRepository(versions=music_versions)
+            await repository.add_band(session, "Band")
+            # Notifications arrive after the commit, give them a moment.
+            await asyncio.sleep(0.5)
+        finally:
+            await connection.close()
+        return payloads
+
+    assert run_with_db(test) == ["Band:1"]
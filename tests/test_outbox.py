@@ -0,0 +1,179 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from src.zypl_interview.subscriptions.models import NotificationOutbox
+from src.zypl_interview.subscriptions.outbox import OutboxDispatcher
+
+
+class FakeNotifier:
+    def __init__(self) -> None:
+        self.jobs: list[asyncio.Future] = []
+
+    async def submit(self, albums_by_band: dict[int, list[int]]) -> asyncio.Future:
+        job = asyncio.get_running_loop().create_future()
+        self.jobs.append(job)
+        return job
+
+
+def make_dispatcher(notifier, max_in_flight: int) -> OutboxDispatcher:
+    return OutboxDispatcher(
+        subscription_repo=mock.Mock(),
+        notifier=notifier,
+        email_integration=mock.Mock(),
+        batch_size=10,
+        poll_interval=60,
+        max_attempts=5,
+        lease=60,
+        digest_window=0,
+        max_in_flight=max_in_flight,
+    )
+
+
+def test_digests_are_sent_in_parallel_and_completed_one_by_one() -> None:
+    notifier = FakeNotifier()
+    dispatcher = make_dispatcher(notifier, max_in_flight=2)
+    events = iter(range(1, 100))
+
+    async def claim(outbox, min_age=0):
+        return [SimpleNamespace(id=next(events), band_id=1, album_id=1)]
+
+    async def main() -> list[tuple]:
+        completed = []
+
+        async def complete(outbox, sent_ids, failed_ids, failed_emails=None):
+            completed.append((sent_ids, failed_ids))
+
+        with (
+            mock.patch.object(dispatcher, "_claim", claim),
+            mock.patch.object(dispatcher, "_complete", complete),
+        ):
+            assert await dispatcher.dispatch_batch() == 1
+            assert await dispatcher.dispatch_batch() == 1
+            third = asyncio.create_task(dispatcher.dispatch_batch())
+            await asyncio.sleep(0.01)
+            # Two digests are in flight, the third waits for one of them.
+            assert not third.done()
+            assert len(notifier.jobs) == 2
+
+            notifier.jobs[1].set_exception(RuntimeError("provider is down"))
+            assert await third == 1
+            notifier.jobs[0].set_result([])
+            notifier.jobs[2].set_result([])
+            await asyncio.sleep(0.01)
+            await dispatcher.stop()
+        return completed
+
+    completed = asyncio.run(main())
+    assert completed == [([], [2]), ([1], []), ([3], [])]
+
+
+class FakeOutbox:
+    """Notification outbox with leases on the monotonic clock."""
+
+    def __init__(self, event_ids: list[int]) -> None:
+        self.claimed_until: dict[int, float | None] = dict.fromkeys(event_ids)
+
+    async def expire_outbox_claims(self, session, outbox, max_attempts) -> int:
+        return 0
+
+    async def claim_outbox_batch(
+        self, session, outbox, limit, max_attempts, lease, min_age=0
+    ) -> list[SimpleNamespace]:
+        if outbox is not NotificationOutbox:
+            return []
+        now = time.monotonic()
+        claimed = []
+        for event_id, claimed_until in self.claimed_until.items():
+            if len(claimed) < limit and (claimed_until is None or claimed_until < now):
+                self.claimed_until[event_id] = now + lease
+                claimed.append(
+                    SimpleNamespace(id=event_id, band_id=1, album_id=event_id)
+                )
+        return claimed
+
+    async def renew_outbox_claims(self, session, outbox, ids, lease) -> None:
+        for event_id in ids:
+            if self.claimed_until.get(event_id) is not None:
+                self.claimed_until[event_id] = time.monotonic() + lease
+
+    async def complete_outbox_batch(
+        self, session, outbox, sent_ids, failed_ids, max_attempts, failed_emails
+    ) -> int:
+        for event_id in sent_ids:
+            self.claimed_until.pop(event_id, None)
+        for event_id in failed_ids:
+            self.claimed_until[event_id] = None
+        return 0
+
+
+class SlowNotifier:
+    """Takes longer to send a digest than the lease of its notifications."""
+
+    def __init__(self, duration: float) -> None:
+        self.duration = duration
+        self.sent_album_ids: list[int] = []
+
+    async def submit(self, albums_by_band: dict[int, list[int]]) -> asyncio.Future:
+        job = asyncio.get_running_loop().create_future()
+
+        async def send() -> None:
+            await asyncio.sleep(self.duration)
+            self.sent_album_ids += albums_by_band[1]
+            job.set_result([])
+
+        asyncio.get_running_loop().call_soon(asyncio.ensure_future, send())
+        return job
+
+
+def test_lease_expiring_mid_dispatch_is_renewed_not_sent_twice() -> None:
+    lease = 0.3
+    outbox = FakeOutbox(list(range(1, 26)))
+    notifier = SlowNotifier(duration=4 * lease)
+    dispatchers = [
+        OutboxDispatcher(
+            subscription_repo=outbox,
+            notifier=notifier,
+            email_integration=mock.Mock(),
+            batch_size=10,
+            poll_interval=0.05,
+            max_attempts=5,
+            lease=lease,
+            digest_window=0,
+            max_in_flight=2,
+        )
+        for _ in range(2)
+    ]
+
+    async def main() -> None:
+        for dispatcher in dispatchers:
+            await dispatcher.start()
+        deadline = time.monotonic() + 10 * lease
+        while outbox.claimed_until and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        # Digests sent again would finish after the outbox is empty.
+        await asyncio.sleep(notifier.duration)
+        for dispatcher in dispatchers:
+            await dispatcher.stop()
+
+    asyncio.run(main())
+    assert not outbox.claimed_until
+    assert sorted(notifier.sent_album_ids) == list(range(1, 26))
+
+
+def test_digest_has_all_notifications_past_the_window() -> None:
+    outbox = FakeOutbox(list(range(1, 26)))
+    notifier = FakeNotifier()
+    dispatcher = make_dispatcher(notifier, max_in_flight=2)
+    dispatcher.subscription_repo = outbox
+
+    async def main() -> int:
+        claimed = await dispatcher.dispatch_batch()
+        notifier.jobs[0].set_result([])
+        await asyncio.sleep(0.01)
+        return claimed
+
+    assert asyncio.run(main()) == 25
+    assert len(notifier.jobs) == 1
+    assert not outbox.claimed_until
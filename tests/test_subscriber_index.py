@@ -0,0 +1,47 @@
+import asyncio
+from unittest import mock
+
+from src.zypl_interview.subscriptions.index import SubscriberIndex
+
+
+class FakeSubscriptions:
+    def __init__(self, chunks: list[list[tuple[int, int]]]) -> None:
+        self.chunks = chunks
+
+    async def iter_subscription_pairs(self, session, chunk_size):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def test_reload_builds_sorted_arrays_from_streamed_pairs() -> None:
+    repository = FakeSubscriptions([[(2, 10), (1, 10)], [(1, 30), (1, 20), (3, 20)]])
+    index = SubscriberIndex(repository, enabled=True, reload_interval=60)
+
+    with mock.patch(
+        "src.zypl_interview.subscriptions.index.get_db_context_session",
+        mock.MagicMock(),
+    ):
+        asyncio.run(index.reload())
+
+    assert index.loaded
+    assert list(index.subscribers(10)) == [1, 2]
+    assert list(index.subscribers(20)) == [1, 3]
+    assert list(index.bands(1)) == [10, 20, 30]
+    assert list(index.bands(4)) == []
+
+
+def test_changes_keep_arrays_sorted() -> None:
+    index = SubscriberIndex(FakeSubscriptions([[(1, 10)]]), True, 60)
+    with mock.patch(
+        "src.zypl_interview.subscriptions.index.get_db_context_session",
+        mock.MagicMock(),
+    ):
+        asyncio.run(index.reload())
+
+    index.add(2, 10)
+    index.add(0, 10)
+    index.remove(1, 10)
+    index.remove(5, 10)
+
+    assert list(index.subscribers(10)) == [0, 2]
+    assert list(index.bands(1)) == []